@@ -1,64 +1,208 @@
 #-*- coding:utf-8 -*-    --------------Ashare 股票行情数据双核心版( https://github.com/mpquant/Ashare ) 
-import json,requests,datetime;      import pandas as pd  #
+import json,requests,datetime,threading,time,collections,itertools;      import numpy as np;      import pandas as pd  #
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+from AshareCalendar import get_calendar;      from requests.adapters import HTTPAdapter;      from urllib3.util.retry import Retry
+
+#------------------ 会话层：连接池复用(keep-alive) + 超时 + 有限重试 + 按数据源限制并发 ----------------------
+HTTP_CONFIG={'timeout':(3.05,10),'retries':2,'backoff':0.3,'pool_connections':4,'pool_maxsize':16}   #(连接,读取)超时秒数,重试次数,退避系数,每主机连接池大小
+PROVIDER_LIMITS={'sina':8,'tx':8}                                     #每个数据源同时在途的最大请求数
+_session=None;   _session_lock=threading.Lock();   _limiters={}
+
+def new_session(**kw):                   #按HTTP_CONFIG新建Session: 每个主机一个keep-alive连接池,失败按指数退避重试
+    cfg={**HTTP_CONFIG,**kw}
+    retry=Retry(total=cfg['retries'],backoff_factor=cfg['backoff'],status_forcelist=(429,500,502,503,504),allowed_methods=frozenset(['GET']))
+    adapter=HTTPAdapter(pool_connections=cfg['pool_connections'],pool_maxsize=cfg['pool_maxsize'],max_retries=retry)
+    s=requests.Session();   s.mount('http://',adapter);   s.mount('https://',adapter)
+    return s
+
+def get_session():                       #进程内共享的默认Session(懒加载)
+    global _session
+    with _session_lock:
+        if _session is None: _session=new_session()
+        return _session
+
+def set_session(session=None):           #注入调用方自己的Session(如带代理/认证),传None恢复默认
+    global _session
+    with _session_lock: _session=session
+
+def configure(limits=None,**kw):         #修改超时/重试/连接池参数 configure(timeout=(2,5),retries=3,limits={'sina':4})
+    global _session
+    HTTP_CONFIG.update(kw);    PROVIDER_LIMITS.update(limits or {})
+    with _session_lock: _session=None;   _limiters.clear()     #下次请求按新配置重建(注入的Session也会被丢弃)
+
+def _limiter(provider):                  #每个数据源一个信号量,限制并发请求数
+    with _session_lock:
+        if provider not in _limiters: _limiters[provider]=threading.BoundedSemaphore(PROVIDER_LIMITS.get(provider,8))
+        return _limiters[provider]
+
+def _http_get(provider, url, session=None):     #所有行情请求的唯一出口
+    with _limiter(provider):
+        r=(session or get_session()).get(url,timeout=HTTP_CONFIG['timeout']);   r.raise_for_status()
+    return r.content
+
+#------------------ 数据源健康度: 延迟/错误统计 + 熔断器, 对冲请求的延迟按主力接口的延迟分位数自适应 ------------------
+HEDGE_CONFIG={'enabled':False,'percentile':95,'min_samples':10,'default_delay':0.5,'min_delay':0.05,'max_delay':2.0,   #默认关闭,get_price(hedge=True)或configure_hedge(enabled=True)开启
+              'window':200,'fail_threshold':5,'cooldown':30}        #连续失败fail_threshold次熔断cooldown秒,期间该数据源降为备用
+
+class ProviderHealth:
+    def __init__(self, name):
+        self.name=name;   self.latencies=collections.deque(maxlen=HEDGE_CONFIG['window']);   self.lock=threading.Lock()
+        self.calls=0;   self.errors=0;   self.fails=0;   self.open_until=0.0       #fails为连续失败次数
+
+    def record(self, latency, ok):
+        with self.lock:
+            self.calls+=1
+            if ok: self.latencies.append(latency);   self.fails=0;   return
+            self.errors+=1;   self.fails+=1
+            if self.fails>=HEDGE_CONFIG['fail_threshold']: self.open_until=time.monotonic()+HEDGE_CONFIG['cooldown']   #熔断(半开后再失败一次立即重新熔断)
+
+    def available(self): return time.monotonic()>=self.open_until
+
+    def delay(self):                     #对冲等待时间 = 近期成功请求延迟的percentile分位数
+        with self.lock: lat=sorted(self.latencies)
+        if len(lat)<HEDGE_CONFIG['min_samples']: return HEDGE_CONFIG['default_delay']
+        d=lat[min(len(lat)-1,int(round(HEDGE_CONFIG['percentile']/100*(len(lat)-1))))]
+        return min(max(d,HEDGE_CONFIG['min_delay']),HEDGE_CONFIG['max_delay'])
+
+    def stats(self):
+        return {'calls':self.calls,'errors':self.errors,'available':self.available(),'hedge_delay':self.delay(),
+                'p50':sorted(self.latencies)[len(self.latencies)//2] if self.latencies else None}
+
+_health={'sina':ProviderHealth('sina'),'tx':ProviderHealth('tx')};   _hedge_pool=None
+
+def configure_hedge(**kw):               #configure_hedge(enabled=True,percentile=90,max_delay=1.0)
+    HEDGE_CONFIG.update(kw)
+
+def provider_stats(): return {k:v.stats() for k,v in _health.items()}      #各数据源的调用/错误次数,熔断状态,当前对冲延迟
+
+#------------------ 快速解析: K线JSON直接填进预分配的连续NumPy数组, 调用方需要时才构建DataFrame ------------------
+class Bars:                              #轻量K线容器: time为datetime64[ns]的int64, open/high/low/close/volume为float64
+    __slots__=('time','open','high','low','close','volume')
+    FIELDS=('open','high','low','close','volume')
+    def __init__(self, time, open, high, low, close, volume):
+        self.time=time;  self.open=open;  self.high=high;  self.low=low;  self.close=close;  self.volume=volume
+    def __len__(self): return len(self.time)
+    def __getitem__(self, idx): return Bars(*(getattr(self,f)[idx] for f in self.__slots__))     #切片/布尔索引
+    @classmethod
+    def from_df(cls, df):                #get_price返回的DataFrame -> Bars
+        return cls(np.asarray(df.index.values,dtype='datetime64[ns]').view('i8'),*(np.ascontiguousarray(df[f].values,dtype=np.float64) for f in cls.FIELDS))
+    def to_df(self):                     #与原接口相同格式的DataFrame
+        df=pd.DataFrame({f:getattr(self,f) for f in self.FIELDS},index=pd.DatetimeIndex(self.time.view('datetime64[ns]')));   df.index.name=''
+        return df
+
+def _decode(rows, times, cols):          #rows:原始K线行, times:时间字符串, cols:open,high,low,close,volume在行中的键/下标
+    n=len(rows);   time=np.array(times,dtype='datetime64[ns]').view('i8') if n else np.empty(0,dtype='i8')
+    block=np.fromiter(itertools.chain.from_iterable([r[c] for r in rows] for c in cols),dtype=np.float64,count=5*n).reshape(5,n)   #字符串一次性转float,每个字段一段连续内存
+    return Bars(time,*block)
+
+def decode_sina(rows):    return _decode(rows,[r['day'] for r in rows],('open','high','low','close','volume'))     #新浪: [{day,open,high,low,close,volume},...]
+def decode_tx_day(rows):  return _decode(rows,[r[0] for r in rows],(1,3,4,2,5))                                  #腾讯日线: [time,open,close,high,low,volume(,分红信息)]
+def decode_tx_min(rows):  return _decode(rows,[f'{r[0][:4]}-{r[0][4:6]}-{r[0][6:8]}T{r[0][8:10]}:{r[0][10:12]}' for r in rows],(1,3,4,2,5))   #腾讯分钟: time为202401021030
 
 #腾讯日线
-def get_price_day_tx(code, end_date='', count=10, frequency='1d'):     #日线获取  
+def get_price_day_tx(code, end_date='', count=10, frequency='1d', session=None, as_bars=False):     #日线获取  
     unit='week' if frequency in '1w' else 'month' if frequency in '1M' else 'day'     #判断日线，周线，月线
     if end_date:  end_date=end_date.strftime('%Y-%m-%d') if isinstance(end_date,datetime.date) else end_date.split(' ')[0]
     end_date='' if end_date==datetime.datetime.now().strftime('%Y-%m-%d') else end_date   #如果日期今天就变成空    
     URL=f'http://web.ifzq.gtimg.cn/appstock/app/fqkline/get?param={code},{unit},,{end_date},{count},qfq'     
-    st= json.loads(requests.get(URL).content);    ms='qfq'+unit;      stk=st['data'][code]   
+    st= json.loads(_http_get('tx',URL,session));    ms='qfq'+unit;      stk=st['data'][code]   
     buf=stk[ms] if ms in stk else stk[unit]       #指数返回不是qfqday,是day
-    df=pd.DataFrame(buf,columns=['time','open','close','high','low','volume'],dtype='float')     
-    df.time=pd.to_datetime(df.time);    df.set_index(['time'], inplace=True);   df.index.name=''          #处理索引 
-    return df
+    bars=decode_tx_day(buf)
+    return bars if as_bars else bars.to_df()
 
 #腾讯分钟线
-def get_price_min_tx(code, end_date=None, count=10, frequency='1d'):    #分钟线获取 
+def get_price_min_tx(code, end_date=None, count=10, frequency='1d', session=None, as_bars=False):    #分钟线获取 
     ts=int(frequency[:-1]) if frequency[:-1].isdigit() else 1           #解析K线周期数
     if end_date: end_date=end_date.strftime('%Y-%m-%d') if isinstance(end_date,datetime.date) else end_date.split(' ')[0]        
     URL=f'http://ifzq.gtimg.cn/appstock/app/kline/mkline?param={code},m{ts},,{count}' 
-    st= json.loads(requests.get(URL).content);       buf=st['data'][code]['m'+str(ts)] 
-    df=pd.DataFrame(buf,columns=['time','open','close','high','low','volume','n1','n2'])   
-    df=df[['time','open','close','high','low','volume']]    
-    df[['open','close','high','low','volume']]=df[['open','close','high','low','volume']].astype('float')
-    df.time=pd.to_datetime(df.time);   df.set_index(['time'], inplace=True);   df.index.name=''          #处理索引     
-    df['close'][-1]=float(st['data'][code]['qt'][code][3])                #最新基金数据是3位的
-    return df
+    st= json.loads(_http_get('tx',URL,session));       bars=decode_tx_min(st['data'][code]['m'+str(ts)])
+    if len(bars): bars.close[-1]=float(st['data'][code]['qt'][code][3])        #最新基金数据是3位的
+    return bars if as_bars else bars.to_df()
 
 
 #sina新浪全周期获取函数，分钟线 5m,15m,30m,60m  日线1d=240m   周线1w=1200m  1月=7200m
-def get_price_sina(code, end_date='', count=10, frequency='60m'):    #新浪全周期获取函数    
+def get_price_sina(code, end_date='', count=10, frequency='60m', session=None, as_bars=False):    #新浪全周期获取函数    
     frequency=frequency.replace('1d','240m').replace('1w','1200m').replace('1M','7200m');   mcount=count
     ts=int(frequency[:-1]) if frequency[:-1].isdigit() else 1       #解析K线周期数
     if (end_date!='') & (frequency in ['240m','1200m','7200m']): 
         end_date=pd.to_datetime(end_date) if not isinstance(end_date,datetime.date) else end_date    #转换成datetime
-        unit=4 if frequency=='1200m' else 29 if frequency=='7200m' else 1    #4,29多几个数据不影响速度
-        count=count+(datetime.datetime.now()-end_date).days//unit            #结束时间到今天有多少天自然日(肯定 >交易日)        
-        #print(code,end_date,count)    
+        unit={'240m':'1d','1200m':'1w','7200m':'1M'}[frequency]
+        count=count+get_calendar().periods(end_date,datetime.datetime.now(),unit)+2      #结束时间之后到今天的K线数,按交易日历精确计算,+2防日历误差
     URL=f'http://money.finance.sina.com.cn/quotes_service/api/json_v2.php/CN_MarketData.getKLineData?symbol={code}&scale={ts}&ma=5&datalen={count}' 
-    dstr= json.loads(requests.get(URL).content);       
-    #df=pd.DataFrame(dstr,columns=['day','open','high','low','close','volume'],dtype='float') 
-    df= pd.DataFrame(dstr,columns=['day','open','high','low','close','volume'])
-    df['open'] = df['open'].astype(float); df['high'] = df['high'].astype(float);                          #转换数据类型
-    df['low'] = df['low'].astype(float);   df['close'] = df['close'].astype(float);  df['volume'] = df['volume'].astype(float)    
-    df.day=pd.to_datetime(df.day);    df.set_index(['day'], inplace=True);     df.index.name=''            #处理索引                 
-    if (end_date!='') & (frequency in ['240m','1200m','7200m']): return df[df.index<=end_date][-mcount:]   #日线带结束时间先返回              
-    return df
-
-def get_price(code, end_date='',count=10, frequency='1d', fields=[]):        #对外暴露只有唯一函数，这样对用户才是最友好的  
-    xcode= code.replace('.XSHG','').replace('.XSHE','')                      #证券代码编码兼容处理 
-    xcode='sh'+xcode if ('XSHG' in code)  else  'sz'+xcode  if ('XSHE' in code)  else code     
-
-    if  frequency in ['1d','1w','1M']:   #1d日线  1w周线  1M月线
-         try:    return get_price_sina( xcode, end_date=end_date,count=count,frequency=frequency)   #主力
-         except: return get_price_day_tx(xcode,end_date=end_date,count=count,frequency=frequency)   #备用                    
-    
-    if  frequency in ['1m','5m','15m','30m','60m']:  #分钟线 ,1m只有腾讯接口  5分钟5m   60分钟60m
-         if frequency in '1m': return get_price_min_tx(xcode,end_date=end_date,count=count,frequency=frequency)
-         try:    return get_price_sina(  xcode,end_date=end_date,count=count,frequency=frequency)   #主力   
-         except: return get_price_min_tx(xcode,end_date=end_date,count=count,frequency=frequency)   #备用
+    bars=decode_sina(json.loads(_http_get('sina',URL,session)) or [])         #无数据时新浪返回null
+    if (end_date!='') & (frequency in ['240m','1200m','7200m']): bars=bars[bars.time<=np.datetime64(pd.Timestamp(end_date),'ns').view('i8')][-mcount:]   #日线带结束时间
+    return bars if as_bars else bars.to_df()
+
+_store=None                                                                   #本地K线仓库(AshareStore.BarStore),None表示每次都走网络
+
+def set_store(store=None):              #挂载本地K线仓库, set_store(AshareStore.BarStore('cache/bars'))
+    global _store;   _store=store
+
+def to_xcode(code):                      #证券代码编码兼容处理 000001.XSHG -> sh000001
+    xcode= code.replace('.XSHG','').replace('.XSHE','')
+    return 'sh'+xcode if ('XSHG' in code)  else  'sz'+xcode  if ('XSHE' in code)  else code
+
+def get_price(code, end_date='',count=10, frequency='1d', fields=[], session=None, hedge=None, as_bars=False):        #对外暴露只有唯一函数，这样对用户才是最友好的  
+    xcode=to_xcode(code)
+    fetch=lambda xcode,**kw: _get_price(xcode,session=session,hedge=hedge,**kw)          #as_bars=True 返回 Bars,省去构建DataFrame
+    if _store is not None and frequency in ['1d','1w','1M','1m','5m','15m','30m','60m']:
+         return _store.get_price(xcode,end_date=end_date,count=count,frequency=frequency,fetch=fetch,as_bars=as_bars)   #仓库只向网络补取缺少的K线
+    return fetch(xcode,end_date=end_date,count=count,frequency=frequency,as_bars=as_bars)
+
+def _routes(frequency):                  #按优先级排列的(数据源,获取函数)
+    if  frequency in ['1d','1w','1M']: return [('sina',get_price_sina),('tx',get_price_day_tx)]   #1d日线  1w周线  1M月线
+    if  frequency=='1m': return [('tx',get_price_min_tx)]                                         #1m只有腾讯接口
+    if  frequency in ['5m','15m','30m','60m']: return [('sina',get_price_sina),('tx',get_price_min_tx)]   #5分钟5m   60分钟60m
+    return []
+
+def _timed(name, func, xcode, kw):       #调用一个数据源并记录延迟/成败,空数据也算失败
+    t=time.perf_counter()
+    try:
+        df=func(xcode,**kw)
+        if df is None or len(df)==0: raise ValueError(f'{name} 未返回 {xcode} 的数据')
+    except Exception:
+        _health[name].record(None,False);   raise
+    _health[name].record(time.perf_counter()-t,True);   return df
+
+def _get_price(xcode, end_date='',count=10, frequency='1d', session=None, hedge=None, as_bars=False):      #网络获取: 新浪主力,腾讯备用
+    routes=sorted(_routes(frequency),key=lambda r: not _health[r[0]].available())           #熔断中的数据源降为备用
+    if not routes: return None
+    kw=dict(end_date=end_date,count=count,frequency=frequency,session=session,as_bars=as_bars)
+    if (HEDGE_CONFIG['enabled'] if hedge is None else hedge) and len(routes)>1: return _get_price_hedged(xcode,routes,kw)
+    for name,func in routes[:-1]:
+        try:    return _timed(name,func,xcode,kw)        #主力
+        except Exception: pass
+    return _timed(*routes[-1],xcode,kw)                  #备用
+
+def _get_price_hedged(xcode, routes, kw):    #主力超过对冲延迟还没返回,同时请求备用,先拿到有效数据的胜出
+    global _hedge_pool
+    with _session_lock:
+        if _hedge_pool is None: _hedge_pool=ThreadPoolExecutor(max_workers=sum(PROVIDER_LIMITS.values())*2,thread_name_prefix='ashare-hedge')
+    (p,pf),(b,bf)=routes[0],routes[1]
+    first=_hedge_pool.submit(_timed,p,pf,xcode,kw)
+    try:    return first.result(timeout=_health[p].delay())
+    except FutureTimeout: pass                           #主力慢了: 对冲
+    except Exception: pass                               #主力很快就失败了: 直接用备用
+    second=_hedge_pool.submit(_timed,b,bf,xcode,kw);   error=None
+    for future in as_completed([first,second]):          #落败的请求继续在后台完成,其延迟照样计入统计
+        try:    return future.result()
+        except Exception as e: error=e
+    raise error
         
+def get_prices(codes, end_date='', count=10, frequency='1d', max_workers=None, session=None, hedge=None, as_bars=False):    #多只股票并发获取,每只仍是新浪主力/腾讯备用
+    codes=list(dict.fromkeys(codes));   data,errors={},{}                        #去重并保持顺序
+    if not codes: return data,errors
+    max_workers=max_workers or sum(PROVIDER_LIMITS.values())                    #实际在途请求数还受每个数据源的并发上限约束
+    with ThreadPoolExecutor(max_workers=min(max_workers,len(codes))) as pool:
+        futures={code:pool.submit(get_price,code,end_date=end_date,count=count,frequency=frequency,session=session,hedge=hedge,as_bars=as_bars) for code in codes}
+        for code,future in futures.items():
+            try:
+                df=future.result()
+                if df is None: raise ValueError(f'不支持的K线周期: {frequency}')
+                data[code]=df
+            except Exception as e: errors[code]=e
+    return data,errors                          #({code:DataFrame或Bars}, {code:异常})
+
 if __name__ == '__main__':    
     df=get_price('sh000001',frequency='1d',count=10)      #支持'1d'日, '1w'周, '1M'月  
     print('上证指数日线行情\n',df)
@@ -0,0 +1,72 @@
+#-*- coding:utf-8 -*-    Ashare A股交易日历: 预计算的交易日序列, 二分查找 O(log n) 计算两个日期之间的交易日数
+#  2015年起按沪深交易所休市安排剔除节假日,更早年份和表外年份按工作日近似(只会多算,不会少算);  learn() 可用指数日线校正
+import datetime;    import numpy as np
+
+HOLIDAYS=[                               #交易所休市日(含周末的区间写法 起:止, 周末本来就不在交易日里)
+ '2015-01-01:2015-01-02','2015-02-18:2015-02-24','2015-04-06','2015-05-01','2015-06-22','2015-09-03:2015-09-04','2015-10-01:2015-10-07',
+ '2016-01-01','2016-02-08:2016-02-12','2016-04-04','2016-05-02','2016-06-09:2016-06-10','2016-09-15:2016-09-16','2016-10-03:2016-10-07',
+ '2017-01-02','2017-01-27:2017-02-02','2017-04-03:2017-04-04','2017-05-01','2017-05-29:2017-05-30','2017-10-02:2017-10-06',
+ '2018-01-01','2018-02-15:2018-02-21','2018-04-05:2018-04-06','2018-04-30:2018-05-01','2018-06-18','2018-09-24','2018-10-01:2018-10-05','2018-12-31',
+ '2019-01-01','2019-02-04:2019-02-08','2019-04-05','2019-05-01:2019-05-03','2019-06-07','2019-09-13','2019-10-01:2019-10-07',
+ '2020-01-01','2020-01-24:2020-01-31','2020-04-06','2020-05-01:2020-05-05','2020-06-25:2020-06-26','2020-10-01:2020-10-08',
+ '2021-01-01','2021-02-11:2021-02-17','2021-04-05','2021-05-03:2021-05-05','2021-06-14','2021-09-20:2021-09-21','2021-10-01:2021-10-07',
+ '2022-01-03','2022-01-31:2022-02-04','2022-04-04:2022-04-05','2022-05-02:2022-05-04','2022-06-03','2022-09-12','2022-10-03:2022-10-07',
+ '2023-01-02','2023-01-23:2023-01-27','2023-04-05','2023-05-01:2023-05-03','2023-06-22:2023-06-23','2023-09-29:2023-10-06',
+ '2024-01-01','2024-02-09:2024-02-16','2024-04-04:2024-04-05','2024-05-01:2024-05-03','2024-06-10','2024-09-16:2024-09-17','2024-10-01:2024-10-07',
+ '2025-01-01','2025-01-28:2025-02-04','2025-04-04','2025-05-01:2025-05-05','2025-06-02','2025-10-01:2025-10-08',
+ '2026-01-01:2026-01-02','2026-02-16:2026-02-23','2026-04-06','2026-05-01:2026-05-05','2026-06-19','2026-09-25','2026-10-01:2026-10-07',
+]
+
+def _holiday_days():
+    days=[]
+    for h in HOLIDAYS:
+        a,_,b=h.partition(':');   days.append(np.arange(np.datetime64(a),np.datetime64(b or a)+1,dtype='datetime64[D]'))
+    return np.concatenate(days)
+
+def _day(d):   return np.datetime64(d.date() if isinstance(d,datetime.datetime) else d,'D')     #日期/字符串/datetime64 -> datetime64[D]
+
+class TradingCalendar:
+    def __init__(self, sessions):
+        self.sessions=np.unique(np.asarray(sessions,dtype='datetime64[D]'))        #有序交易日
+
+    @classmethod
+    def default(cls, start='2005-01-01', end=None):      #工作日 - 节假日, 默认到明年年底
+        end=end or f'{datetime.date.today().year+1}-12-31'
+        days=np.arange(np.datetime64(start),np.datetime64(end)+1,dtype='datetime64[D]')
+        days=days[np.is_busday(days)];   return cls(np.setdiff1d(days,_holiday_days()))
+
+    def is_session(self, d):
+        d=_day(d);   i=np.searchsorted(self.sessions,d)
+        return bool(i<len(self.sessions) and self.sessions[i]==d)
+
+    def count(self, start, end):         #(start,end] 之间的交易日数,即start之后到end(含)有几个交易日
+        return int(np.searchsorted(self.sessions,_day(end),'right')-np.searchsorted(self.sessions,_day(start),'right'))
+
+    def sessions_in(self, start, end):   #[start,end] 内的交易日
+        return self.sessions[np.searchsorted(self.sessions,_day(start),'left'):np.searchsorted(self.sessions,_day(end),'right')]
+
+    def offset(self, d, n):              #d之后第n个交易日(n<0为之前), d本身不是交易日时从它前一个交易日起算
+        i=np.searchsorted(self.sessions,_day(d),'right')-1+n
+        return self.sessions[min(max(i,0),len(self.sessions)-1)]
+
+    def periods(self, start, end, frequency='1d'):   #(start,end] 之间会产生几根日/周/月K线
+        s=self.sessions[np.searchsorted(self.sessions,_day(start),'right'):np.searchsorted(self.sessions,_day(end),'right')]
+        if frequency=='1w': return len(np.unique((s-np.datetime64('1970-01-05'))//7))   #1970-01-05是周一
+        if frequency=='1M': return len(np.unique(s.astype('datetime64[M]')))
+        return len(s)
+
+    def missing(self, times):            #times所覆盖区间内缺失的交易日(停牌或数据缺口)
+        days=np.unique(np.asarray(times,dtype='datetime64[D]'))
+        if not len(days): return days
+        return np.setdiff1d(self.sessions_in(days[0],days[-1]),days)
+
+    def learn(self, times):              #用实际K线日期(如上证指数日线)校正所覆盖区间的交易日
+        days=np.unique(np.asarray(times,dtype='datetime64[D]'))
+        if len(days): self.sessions=np.union1d(self.sessions[(self.sessions<days[0])|(self.sessions>days[-1])],days)
+
+_calendar=None
+
+def get_calendar():                      #进程内共享的默认日历
+    global _calendar
+    if _calendar is None: _calendar=TradingCalendar.default()
+    return _calendar
@@ -0,0 +1,47 @@
+#-*- coding:utf-8 -*-    Ashare 实时行情快照: 一次HTTP请求取多只股票的腾讯行情, 解析成一个列式结构化数组
+#  for changed in watch(['sh600519','sz000001'],interval=3): print(changed)     #只输出有变化的股票
+import time;    import logging;    import numpy as np;    from concurrent.futures import ThreadPoolExecutor
+from Ashare import _http_get, to_xcode
+
+QUOTE_FIELDS={'price':3,'prev_close':4,'open':5,'volume':6,'bid1':9,'bid1_vol':10,'ask1':19,'ask1_vol':20,'high':33,'low':34,'amount':37}   #腾讯行情串的字段下标,量为手,额为万元
+QUOTE_DTYPE=np.dtype([('code','U10'),('time','<i8')]+[(f,'<f8') for f in QUOTE_FIELDS])                            #time为datetime64[ns]的int64
+log=logging.getLogger(__name__)          #快照失败记入日志,由调用方配置handler
+BATCH=60                                 #每个请求包含的股票数(URL长度有限)
+
+def parse_quotes(text):                  #v_sh600519="1~贵州茅台~600519~1500.00~...";  -> 结构化数组
+    lines=[line.strip().split('=',1) for line in text.split(';') if '="' in line]
+    lines=[(k[2:],v.strip('"').split('~')) for k,v in lines if k.startswith('v_')]
+    lines=[(c,r) for c,r in lines if len(r)>max(QUOTE_FIELDS.values())]                          #代码错误时返回的短串丢掉
+    out=np.empty(len(lines),dtype=QUOTE_DTYPE)
+    if not lines: return out
+    out['code']=[c for c,_ in lines]
+    out['time']=np.array([f'{r[30][:4]}-{r[30][4:6]}-{r[30][6:8]}T{r[30][8:10]}:{r[30][10:12]}:{r[30][12:14]}' for _,r in lines],dtype='datetime64[ns]').view('i8')
+    for f,i in QUOTE_FIELDS.items(): out[f]=np.array([r[i] or 'nan' for _,r in lines],dtype=np.float64)
+    return out
+
+def get_quotes(codes, session=None, max_workers=4):     #多只股票行情快照,每BATCH只合并成一个请求
+    codes=[to_xcode(c).lower() for c in dict.fromkeys(codes)]
+    urls=[f'http://qt.gtimg.cn/q={",".join(codes[i:i+BATCH])}' for i in range(0,len(codes),BATCH)]
+    if not urls: return np.empty(0,dtype=QUOTE_DTYPE)
+    with ThreadPoolExecutor(max_workers=min(max_workers,len(urls))) as pool:
+        parts=list(pool.map(lambda url: parse_quotes(_http_get('tx',url,session).decode('gbk',errors='replace')),urls))
+    return np.concatenate(parts)
+
+def changed(prev, cur, fields=('price','volume','bid1','bid1_vol','ask1','ask1_vol')):    #cur中相对prev有变化(或新出现)的行
+    if prev is None or not len(prev): return cur
+    p=np.argsort(prev['code']);   idx=np.searchsorted(prev['code'],cur['code'],sorter=p);   idx=p[np.minimum(idx,len(prev)-1)]
+    mask=prev['code'][idx]!=cur['code']                                                          #新出现的代码
+    for f in fields: mask|=~((prev[f][idx]==cur[f])|(np.isnan(prev[f][idx])&np.isnan(cur[f])))
+    return cur[mask]
+
+def watch(codes, interval=3, fields=('price','volume','bid1','bid1_vol','ask1','ask1_vol'), session=None, polls=None):   #轮询,每次只产出变化的股票
+    prev=None;   n=0
+    while polls is None or n<polls:
+        t=time.monotonic()
+        try:
+            cur=get_quotes(codes,session=session)
+            diff=changed(prev,cur,fields);   prev=cur
+            if len(diff): yield diff
+        except Exception as e: log.warning('获取行情快照失败: %s',e)                                     #网络抖动不中断轮询
+        n+=1
+        if polls is None or n<polls: time.sleep(max(0.0,interval-(time.monotonic()-t)))
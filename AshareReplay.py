@@ -0,0 +1,83 @@
+#-*- coding:utf-8 -*-    Ashare 行情录制/回放: 录制模式把新浪/腾讯的原始返回存盘, 回放模式由进程内的本地HTTP服务按原样返回
+#  可注入延迟和错误, 在没有网络的机器上也能稳定地测量获取吞吐量、主备切换行为和解析开销
+#  with record('fixtures'):  Ashare.get_prices(codes,count=120)          #录制
+#  with replay('fixtures',latency={'money.finance.sina.com.cn':0.2},error_rate={'money.finance.sina.com.cn':0.5}):  ...   #回放
+import os, sys, json, time, hashlib, threading, contextlib;    from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import Ashare
+
+def fixture_key(url):  return hashlib.sha1(url.encode('utf-8')).hexdigest()[:20]       #按完整URL定位录制文件
+
+class RecordingSession:                  #包装真实Session,每个成功的响应都按URL落盘
+    def __init__(self, root, session=None):
+        self.root=root;   self.session=session or Ashare.new_session();   self._lock=threading.Lock()
+        os.makedirs(root,exist_ok=True)
+
+    def get(self, url, **kw):
+        r=self.session.get(url,**kw)
+        if r.status_code==200:
+            key=fixture_key(url)
+            with open(os.path.join(self.root,key+'.bin'),'wb') as f: f.write(r.content)
+            with self._lock, open(os.path.join(self.root,'index.jsonl'),'a',encoding='utf-8') as f: f.write(json.dumps({'key':key,'url':url},ensure_ascii=False)+'\n')
+        return r
+
+class FixtureServer:                     #本地替身服务: GET /<原主机><原路径>?<原参数> 返回录制内容
+    def __init__(self, root, latency=0.0, error_rate=0.0, seed=0, port=0):
+        self.root=root;   self.latency=latency;   self.error_rate=error_rate;   self.seed=seed    #latency/error_rate可按主机给dict
+        self.hits={};   self._lock=threading.Lock();   server=self
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):   server._serve(self)
+            def log_message(self, *args): pass
+        self.httpd=ThreadingHTTPServer(('127.0.0.1',port),Handler);   self.httpd.daemon_threads=True
+        self.url=f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        self._thread=threading.Thread(target=self.httpd.serve_forever,daemon=True)
+
+    def start(self):  self._thread.start();   return self
+    def stop(self):   self.httpd.shutdown();   self.httpd.server_close()
+    def __enter__(self):  return self.start()
+    def __exit__(self, *exc):  self.stop()
+
+    def _by_host(self, value, host):  return value.get(host,0.0) if isinstance(value,dict) else value
+
+    def _roll(self, url):                #同一URL第n次请求的伪随机数,与线程调度无关,保证可复现
+        with self._lock: n=self.hits[url]=self.hits.get(url,0)+1
+        return int(hashlib.sha1(f'{self.seed}:{url}:{n}'.encode()).hexdigest()[:8],16)/0xffffffff
+
+    def _serve(self, req):
+        url='http:/'+req.path;   host=urlsplit(url).netloc
+        time.sleep(self._by_host(self.latency,host))
+        if self._roll(url)<self._by_host(self.error_rate,host): return self._reply(req,503,b'injected error')
+        p=os.path.join(self.root,fixture_key(url)+'.bin')
+        if not os.path.exists(p): return self._reply(req,404,b'not recorded')
+        with open(p,'rb') as f: self._reply(req,200,f.read())
+
+    def _reply(self, req, status, body):
+        req.send_response(status);   req.send_header('Content-Type','application/octet-stream')
+        req.send_header('Content-Length',str(len(body)));   req.end_headers();   req.wfile.write(body)
+
+class ReplaySession:                     #把行情URL改写到本地替身服务,其余与默认Session相同(连接池/重试)
+    def __init__(self, server_url, session=None):
+        self.server_url=server_url;   self.session=session or Ashare.new_session(retries=0)   #回放时注入的错误要原样暴露给主备切换逻辑
+    def get(self, url, **kw):
+        return self.session.get(self.server_url+'/'+url.split('://',1)[1],**kw)
+
+@contextlib.contextmanager
+def record(root, session=None):          #期间所有 Ashare 请求都会被录制
+    prev=Ashare._session;   Ashare.set_session(RecordingSession(root,session))
+    try:     yield
+    finally: Ashare.set_session(prev)
+
+@contextlib.contextmanager
+def replay(root, latency=0.0, error_rate=0.0, seed=0):     #期间所有 Ashare 请求都由录制文件回放
+    prev=Ashare._session
+    with FixtureServer(root,latency=latency,error_rate=error_rate,seed=seed) as server:
+        Ashare.set_session(ReplaySession(server.url))
+        try:     yield server
+        finally: Ashare.set_session(prev)
+
+if __name__ == '__main__':    #python AshareReplay.py record fixtures sh600519 sz000001   /   python AshareReplay.py replay fixtures sh600519 sz000001
+    mode,root,codes=sys.argv[1],sys.argv[2],sys.argv[3:] or ['sh000001','sh600519','sz000001']
+    ctx=record(root) if mode=='record' else replay(root)
+    with ctx:
+        t=time.perf_counter();   data,errors=Ashare.get_prices(codes,count=120,frequency='1d')
+        print(f'{mode}: {len(data)}只成功 {len(errors)}只失败, 用时 {time.perf_counter()-t:.3f}s',errors or '')
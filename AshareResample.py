@@ -0,0 +1,51 @@
+#-*- coding:utf-8 -*-    Ashare 本地重采样: 日线合成周线/月线, 1m/5m合成15m/30m/60m, 按A股交易时段切分(9:30-11:30, 13:00-15:00)
+#  多周期分析只需每只股票取一次最细周期的K线:  frames=get_price_multi('sh600519',['1d','1w','1M'],count=60)
+import numpy as np;    import Ashare;    from Ashare import Bars
+
+MINUTES={'1m':1,'5m':5,'15m':15,'30m':30,'60m':60}
+RATIO={'1w':5,'1M':23}                                   #一周/一月最多的交易日数,用来估算需要多少根日线
+
+def _aggregate(bars, key, time=None):    #bars按时间有序, key相同的连续K线合成一根: 开取首,收取尾,高取max,低取min,量求和
+    if not len(bars): return bars
+    start=np.flatnonzero(np.r_[True,key[1:]!=key[:-1]]);   end=np.r_[start[1:],len(key)]-1
+    return Bars(bars.time[end] if time is None else time[end],bars.open[start],np.maximum.reduceat(bars.high,start),
+                np.minimum.reduceat(bars.low,start),bars.close[end],np.add.reduceat(bars.volume,start))
+
+def to_weekly(bars):                     #周线,时间标为该周最后一个交易日(与新浪周线一致)
+    days=bars.time.view('datetime64[ns]').astype('datetime64[D]')
+    return _aggregate(bars,(days-np.datetime64('1970-01-05'))//np.timedelta64(7,'D'))    #1970-01-05是周一
+
+def to_monthly(bars):                    #月线,时间标为该月最后一个交易日
+    return _aggregate(bars,bars.time.view('datetime64[ns]').astype('datetime64[M]').view('i8'))
+
+def to_minutes(bars, frequency):         #分钟线合成更大周期, 每根分钟线的时间是它的结束时间(10:35表示10:30-10:35)
+    n=MINUTES[frequency];   t=bars.time.view('datetime64[ns]');   day=t.astype('datetime64[D]')
+    clock=((t-day)//np.timedelta64(1,'m')).astype(np.int64)                                  #当天第几分钟
+    m=np.where(clock<=690,clock-570,clock-780+120)                                           #交易分钟: 上午0..120, 下午121..240
+    bucket=np.maximum((m+n-1)//n,1)                                                          #09:30集合竞价那根并入第一根
+    close=bucket*n;   close=np.where(close<=120,close+570,close-120+780)                     #每个分组的收盘时刻(分钟) 如60m: 10:30,11:30,14:00,15:00
+    label=(day+close.astype('timedelta64[m]')).astype('datetime64[ns]').view('i8')
+    return _aggregate(bars,day.view('i8')*1000+bucket,time=label)
+
+def resample(data, frequency):           #data为Bars或get_price返回的DataFrame,返回同类型
+    is_df=not isinstance(data,Bars);   bars=Bars.from_df(data) if is_df else data
+    if frequency=='1w': out=to_weekly(bars)
+    elif frequency=='1M': out=to_monthly(bars)
+    elif frequency=='1d': out=bars
+    elif frequency in MINUTES: out=to_minutes(bars,frequency)
+    else: raise ValueError(f'不支持的K线周期: {frequency}')
+    return out.to_df() if is_df else out
+
+def _base(frequencies):                  #能合成全部目标周期的最细周期
+    if all(f in ['1d','1w','1M'] for f in frequencies): return '1d'
+    if all(f in MINUTES for f in frequencies):
+        if '1m' in frequencies or any(MINUTES[f]%5 for f in frequencies): return '1m'
+        return '5m'
+    raise ValueError('日线级别和分钟级别不能从同一份K线合成')
+
+def get_price_multi(code, frequencies, count=10, end_date='', as_bars=False, **kw):     #一次获取,本地合成多个周期 {frequency: DataFrame}
+    base=_base(frequencies)
+    ratio=max(RATIO.get(f,MINUTES.get(f,1)//MINUTES.get(base,1)) for f in frequencies)
+    bars=Ashare.get_price(code,end_date=end_date,count=count*ratio+ratio,frequency=base,as_bars=True,**kw)   #多取一组,丢掉开头不完整的那根
+    out={f:resample(bars,f)[-count:] for f in frequencies}
+    return out if as_bars else {f:b.to_df() for f,b in out.items()}
@@ -0,0 +1,81 @@
+#-*- coding:utf-8 -*-    Ashare 本地K线仓库: 每个代码/周期一个内存映射的 .npy 文件, 每次只向数据源补取最新的几根K线
+#  用法:  import Ashare, AshareStore;   Ashare.set_store(AshareStore.BarStore('cache/bars'))   之后 get_price 自动走仓库
+import os, datetime, threading;    import numpy as np;    import pandas as pd
+from Ashare import Bars;    from AshareCalendar import get_calendar
+
+FIELDS=['open','high','low','close','volume']                                         #与新浪接口返回的列顺序一致
+BAR_DTYPE=np.dtype([('time','<i8')]+[(f,'<f8') for f in FIELDS])                      #time为datetime64[ns]的int64表示
+BARS_PER_DAY={'1m':241,'5m':48,'15m':16,'30m':8,'60m':4}                      #1m腾讯含09:30集合竞价那根
+
+def to_struct(bars):                     #Ashare.Bars -> 落盘用的结构化数组
+    arr=np.empty(len(bars),dtype=BAR_DTYPE);   arr['time']=bars.time
+    for f in FIELDS: arr[f]=getattr(bars,f)
+    return arr
+
+def from_struct(arr):                    #结构化数组 -> Ashare.Bars(各字段复制为连续数组)
+    return Bars(*(np.ascontiguousarray(arr[f]) for f in ['time']+FIELDS))
+
+def bars_since(last_time, frequency, now=None):    #从last_time到now最多新增多少根K线(按交易日历计算)
+    now=now or datetime.datetime.now();   cal=get_calendar()
+    if frequency in ['1d','1w','1M']: return cal.periods(last_time,now,frequency)
+    return (cal.count(last_time,now)+1)*BARS_PER_DAY[frequency]                       #分钟线: last当天可能未收完,多算一天
+
+class BarStore:
+    def __init__(self, root='cache/bars', overlap=5, rtol=1e-6):
+        self.root=root;   self.overlap=overlap;   self.rtol=rtol                    #overlap:与已存数据重叠比对的K线数
+        self._locks={};   self._lock=threading.Lock()
+
+    def path(self, code, frequency):     #1M(月线)和1m(分钟线)在不区分大小写的文件系统上会冲突,月线目录改名
+        return os.path.join(self.root,'1mon' if frequency=='1M' else frequency,f'{code}.npy')
+
+    def load(self, code, frequency):     #只读内存映射,不存在返回None
+        p=self.path(code,frequency)
+        return np.load(p,mmap_mode='r') if os.path.exists(p) else None
+
+    def save(self, code, frequency, bars):   #先写临时文件再原子替换,避免读到半截文件
+        p=self.path(code,frequency);   os.makedirs(os.path.dirname(p),exist_ok=True)
+        tmp=f'{p}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp,'wb') as f: np.save(f,np.ascontiguousarray(bars,dtype=BAR_DTYPE))
+        os.replace(tmp,p)
+
+    def gaps(self, code, frequency='1d'):   #已存日线中缺失的交易日(停牌或数据缺口)
+        stored=self.load(code,frequency)
+        return get_calendar().missing(np.array(stored['time']).view('datetime64[ns]')) if stored is not None else np.array([],dtype='datetime64[D]')
+
+    def _code_lock(self, code, frequency):
+        with self._lock: return self._locks.setdefault((code,frequency),threading.Lock())
+
+    def get_price(self, code, end_date='', count=10, frequency='1d', fetch=None, as_bars=False):    #fetch(code,end_date=,count=,frequency=,as_bars=)为真正的网络获取函数
+        with self._code_lock(code,frequency):
+            stored=self.load(code,frequency)
+            if end_date: return self._history(stored,code,end_date,count,frequency,fetch,as_bars)
+            if stored is not None: stored=np.array(stored)                             #复制出来并释放映射,Windows下映射中的文件不能被替换
+            bars=self._top_up(stored,code,count,frequency,fetch)
+        bars=from_struct(bars[-count:])
+        return bars if as_bars else bars.to_df()
+
+    def _history(self, stored, code, end_date, count, frequency, fetch, as_bars):     #带结束时间: 仓库已覆盖就直接切片,否则透传不落盘
+        end=pd.to_datetime(end_date)
+        if frequency in ['1d','1w','1M'] and not isinstance(end_date,datetime.datetime): end=end+pd.Timedelta(days=1)-pd.Timedelta(1)   #日线结束日期包含当天
+        end=np.datetime64(end,'ns').view('i8')
+        if stored is not None and len(stored) and stored['time'][-1]>end:        #仓库中有end之后的K线,说明end之前是连续完整的
+            hist=stored[stored['time']<=end]
+            if len(hist)>=count: bars=from_struct(hist[-count:]);   return bars if as_bars else bars.to_df()
+        return fetch(code,end_date=end_date,count=count,frequency=frequency,as_bars=as_bars)
+
+    def _full(self, code, count, frequency, fetch):
+        bars=to_struct(fetch(code,end_date='',count=count,frequency=frequency,as_bars=True))
+        self.save(code,frequency,bars);   return bars
+
+    def _top_up(self, stored, code, count, frequency, fetch):      #只补取最后一根之后的K线并拼接
+        if stored is None or len(stored)<count: return self._full(code,count,frequency,fetch)
+        need=bars_since(np.datetime64(int(stored['time'][-1]),'ns'),frequency)+self.overlap
+        if need>=count: return self._full(code,max(count,len(stored)),frequency,fetch)   #隔得太久,增量不划算
+        new=to_struct(fetch(code,end_date='',count=need,frequency=frequency,as_bars=True))
+        if not len(new): return stored
+        if new['time'][0]>stored['time'][-1]: return self._full(code,max(count,len(stored)),frequency,fetch)   #与已存数据接不上,说明中间有缺口
+        _,i,j=np.intersect1d(stored['time'][:-1],new['time'],return_indices=True)   #最后一根可能是盘中未完成K线,不参与比对
+        if len(i) and not all(np.allclose(stored[f][i],new[f][j],rtol=self.rtol,equal_nan=True) for f in ['open','high','low','close']):
+            return self._full(code,max(count,len(stored)),frequency,fetch)          #前复权价格变了(除权除息),整段历史重写
+        bars=np.concatenate([stored[stored['time']<new['time'][0]],new])
+        self.save(code,frequency,bars);   return bars
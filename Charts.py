@@ -0,0 +1,409 @@
+"""
+技术指标图表渲染
+
+字体和全局样式每个进程只注册一次；图表模板（画布、子图、线条、柱状图、参考线和图例）按
+K线数量、面板组合和DPI预先布局好并缓存，每只股票只替换线条数据、柱高和标题后重新栅格化
+浏览器端绘图模式下不栅格化，只输出面板定义（client_spec）和量化差分编码后的指标数据（chart_payload），
+由 static/js/report_charts.js 在 canvas 上绘制同样的面板；
+外部文件模式下图片按内容哈希（chart_key）命名，输入不变时不重新渲染，长期没有被引用的文件由 prune 清理
+"""
+import base64
+import hashlib
+import os
+import threading
+import time
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.dates as mdates
+import matplotlib.font_manager as fm
+from matplotlib import rcParams
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+FONT_PATH = './static/fonts/微软雅黑.ttf'
+
+# 全局样式
+STYLE = {
+    'axes.facecolor': '#F8F9FA',
+    'axes.edgecolor': '#666666',
+    'grid.color': '#666666',
+    'grid.linestyle': '--',
+    'xtick.color': '#666666',
+    'ytick.color': '#666666',
+    'font.size': 10,
+    'axes.unicode_minus': False,
+    'axes.grid': True,
+    'grid.alpha': 0.3,
+    'axes.labelsize': 12,
+    'axes.titlesize': 14,
+    'figure.titlesize': 16,
+    'lines.linewidth': 1.5,
+    'lines.markersize': 6
+}
+
+# 面板定义：lines 为 (列名, 颜色, 图例, 额外样式)，bar 为 (列名, 图例)，hlines 为 (y值, 颜色)，rows 为占用的行数
+PANELS = {
+    'price': {
+        'title': '{stock_name} ({code}) 技术指标',
+        'rows': 2,
+        'lines': [
+            ('close', '#2E4053', '收盘价', {'linewidth': 2}),
+            ('MA5', '#E74C3C', 'MA5', {'alpha': 0.7}),
+            ('MA10', '#3498DB', 'MA10', {'alpha': 0.7}),
+            ('MA20', '#2ECC71', 'MA20', {'alpha': 0.7}),
+            ('BOLL_UP', '#E74C3C', 'BOLL上轨', {'linestyle': '--', 'alpha': 0.7}),
+            ('BOLL_MID', '#F4D03F', 'BOLL中轨', {'linestyle': '--', 'alpha': 0.7}),
+            ('BOLL_LOW', '#2ECC71', 'BOLL下轨', {'linestyle': '--', 'alpha': 0.7}),
+        ],
+    },
+    'macd': {
+        'title': 'MACD (指数平滑异同移动平均线)',
+        'lines': [('DIF', '#E74C3C', 'DIF(差离值)', {}), ('DEA', '#2ECC71', 'DEA(讯号线)', {})],
+        'bar': ('MACD', 'MACD(指数平滑异同移动平均线)'),
+    },
+    'kdj': {
+        'title': 'KDJ(随机指标)',
+        'lines': [('K', '#E74C3C', 'K(随机指标K值)', {}), ('D', '#2ECC71', 'D(随机指标D值)', {}),
+                  ('J', '#3498DB', 'J(随机指标J值)', {})],
+    },
+    'rsi': {
+        'title': 'RSI (相对强弱指标)',
+        'lines': [('RSI', '#8E44AD', 'RSI(相对强弱指标)', {})],
+        'hlines': [(80, '#E74C3C'), (20, '#2ECC71')],
+    },
+    'bias': {
+        'title': 'BIAS (乖离率)',
+        'lines': [('BIAS1', '#E74C3C', 'BIAS1', {}), ('BIAS2', '#2ECC71', 'BIAS2', {}), ('BIAS3', '#3498DB', 'BIAS3', {})],
+    },
+    'dmi': {
+        'title': 'DMI(动向指标)',
+        'lines': [('PDI', '#E74C3C', 'PDI(上升方向线)', {}), ('MDI', '#2ECC71', 'MDI(下降方向线)', {}),
+                  ('ADX', '#3498DB', 'ADX(趋向指标)', {}), ('ADXR', '#F4D03F', 'ADXR(平均方向指数)', {})],
+    },
+    'trix': {
+        'title': 'TRIX(三重指数平滑平均线)',
+        'lines': [('TRIX', '#E74C3C', 'TRIX', {}), ('TRMA', '#2ECC71', 'TRMA', {})],
+    },
+    'roc': {
+        'title': 'ROC(变动率)',
+        'lines': [('ROC', '#E74C3C', 'ROC(变动率)', {}), ('MAROC', '#2ECC71', 'MAROC(移动平均线)', {})],
+    },
+    'volume': {
+        'title': '成交量指标',
+        'lines': [('VR', '#E74C3C', 'VR(成交量比率)', {}), ('AR', '#2ECC71', 'AR(人气指标)', {}),
+                  ('BR', '#3498DB', 'BR(意愿指标)', {})],
+    },
+    'mtm': {
+        'title': 'MTM(动量指标)',
+        'lines': [('MTM', '#E74C3C', 'MTM', {}), ('MTMMA', '#2ECC71', 'MTMMA', {})],
+    },
+    'dma': {
+        'title': 'DMA(平行线差指标)',
+        'lines': [('DIF_DMA', '#E74C3C', 'DIF_DMA', {}), ('DIFMA_DMA', '#2ECC71', 'DIFMA_DMA', {})],
+    },
+}
+
+# 渲染配置，默认值可由环境变量 CHART_DPI、CHART_PANELS（逗号分隔的面板名）、CHART_RETENTION_DAYS 覆盖；
+# digits 为浏览器端绘图模式下数据保留的小数位数，retention_days 为外部文件模式下未被引用的图表文件的保留天数
+CHART_CONFIG = {
+    'dpi': int(os.getenv('CHART_DPI', '100')),
+    'panels': tuple(p.strip() for p in os.getenv('CHART_PANELS', '').split(',') if p.strip()) or tuple(PANELS),
+    'digits': 3,
+    'retention_days': float(os.getenv('CHART_RETENTION_DAYS', '7')),
+}
+
+ROW_HEIGHT = 32 / 12  # 每行面板的高度（英寸），全部面板共12行时与原来的 15x32 英寸一致
+MARGIN = 0.6  # 画布上下留白（英寸），代替 bbox_inches='tight' 的二次绘制
+
+# 渲染器签名：面板定义或样式变化后，按内容寻址的旧图表文件自动失效
+RENDER_KEY = hashlib.blake2b(repr((PANELS, STYLE, ROW_HEIGHT, MARGIN)).encode(), digest_size=8).hexdigest()
+
+_font_name = None
+_setup_lock = threading.Lock()
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def configure(**kw):
+    """修改渲染配置（dpi、panels、digits），已缓存的模板按新配置重新创建"""
+    if 'panels' in kw:
+        kw['panels'] = _check_panels(kw['panels'])
+    CHART_CONFIG.update(kw)
+
+
+def _check_panels(panels):
+    unknown = [p for p in panels if p not in PANELS]
+    if unknown:
+        raise ValueError(f"未知的图表面板: {unknown}，可选: {list(PANELS)}")
+    return tuple(panels)
+
+
+def setup(font_path=None):
+    """
+    注册字体并设置全局样式，每个进程只执行一次
+
+    Returns:
+        str: 注册的字体名
+    """
+    global _font_name
+    with _setup_lock:
+        if _font_name is None:
+            font_path = font_path or FONT_PATH
+            if not os.path.exists(font_path):
+                raise FileNotFoundError(f"找不到字体文件: {font_path}")
+            fm.fontManager.addfont(font_path)
+            rcParams.update(STYLE)
+            rcParams['font.sans-serif'] = [fm.FontProperties(fname=font_path).get_name()]
+            _font_name = rcParams['font.sans-serif'][0]
+    return _font_name
+
+
+def _style_axis(ax: Axes):
+    """统一设置坐标轴样式"""
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['left'].set_color('#666666')
+    ax.spines['bottom'].set_color('#666666')
+    ax.tick_params(colors='#666666')
+    ax.grid(True, linestyle='--', alpha=0.3)
+    ax.legend(loc='upper left', frameon=True, facecolor='white',
+              edgecolor='none', fontsize=10)
+    ax.set_facecolor('#F8F9FA')
+
+
+class ChartTemplate:
+    """预先布局好的图表，画布和全部artist只创建一次，每次渲染只更新数据"""
+
+    def __init__(self, n_bars, panels, dpi):
+        setup()
+        self.n_bars = n_bars
+        self.panels = _check_panels(panels)
+        self.dpi = dpi
+        self.lock = threading.Lock()
+
+        rows = sum(PANELS[name].get('rows', 1) for name in self.panels)
+        height = ROW_HEIGHT * rows + 2 * MARGIN
+        self.fig = Figure(figsize=(15, height))
+        FigureCanvasAgg(self.fig)
+        self.fig.patch.set_facecolor('#F0F2F6')
+        grid = self.fig.add_gridspec(rows, 1, left=0.06, right=0.98, top=1 - MARGIN / height,
+                                     bottom=MARGIN / height, hspace=0.4)
+
+        # 用占位日期创建artist，确定坐标轴的日期单位
+        x = np.datetime64('2000-01-03') + np.arange(n_bars)
+        zeros = np.zeros(n_bars)
+        self.axes = []
+        row = 0
+        for name in self.panels:
+            spec = PANELS[name]
+            span = spec.get('rows', 1)
+            ax = self.fig.add_subplot(grid[row:row + span, 0])
+            row += span
+            lines = [(col, ax.plot(x, zeros, color=color, label=label, **{'alpha': 0.8, **style})[0])
+                     for col, color, label, style in spec['lines']]
+            bars = None
+            if 'bar' in spec:
+                col, label = spec['bar']
+                bars = (col, ax.bar(x, zeros, label=label, alpha=0.6))
+            for y, color in spec.get('hlines', ()):
+                ax.axhline(y=y, color=color, linestyle='--', alpha=0.5)
+            _style_axis(ax)
+            if bars:
+                # 柱子的颜色随数值变化，图例色块在渲染时取第一根柱子的颜色
+                legend = ax.get_legend()
+                labels = [text.get_text() for text in legend.get_texts()]
+                bars += (legend.legend_handles[labels.index(label)],)
+            self.axes.append((ax, spec, lines, bars))
+
+    def render(self, df, stock_name, code):
+        """
+        用一只股票的数据更新模板并栅格化
+
+        Returns:
+            bytes: PNG图片
+        """
+        index = df.index.values
+        x = mdates.date2num(index) if np.issubdtype(index.dtype, np.datetime64) else np.arange(len(df), dtype=float)
+        with self.lock:
+            for ax, spec, lines, bars in self.axes:
+                ax.set_title(spec['title'].format(stock_name=stock_name, code=code), pad=12)
+                for col, line in lines:
+                    line.set_data(x, df[col].values)
+                if bars:
+                    col, container, handle = bars
+                    values = df[col].values
+                    for rect, xi, h in zip(container.patches, x, values):
+                        rect.set_x(xi - rect.get_width() / 2)
+                        rect.set_height(h)
+                        rect.set_facecolor('#E74C3C' if h > 0 else '#2ECC71')
+                    handle.set_facecolor(container.patches[0].get_facecolor())
+                ax.relim()
+                ax.autoscale_view()
+            buffer = BytesIO()
+            self.fig.savefig(buffer, format='png', dpi=self.dpi)
+        return buffer.getvalue()
+
+
+def get_template(n_bars, panels=None, dpi=None):
+    """按 (K线数量, 面板组合, DPI) 取缓存的图表模板，没有时创建"""
+    key = (n_bars, _check_panels(panels or CHART_CONFIG['panels']), dpi or CHART_CONFIG['dpi'])
+    with _templates_lock:
+        if key not in _templates:
+            _templates[key] = ChartTemplate(*key)
+        return _templates[key]
+
+
+def render_png(df, stock_name, code, panels=None, dpi=None):
+    """
+    渲染技术指标图表
+
+    Args:
+        df: 含技术指标列的DataFrame
+        panels: 要绘制的面板名列表，默认为 CHART_CONFIG['panels']
+        dpi: 分辨率，默认为 CHART_CONFIG['dpi']
+
+    Returns:
+        bytes: PNG图片
+    """
+    return get_template(len(df), panels, dpi).render(df, stock_name, code)
+
+
+def render_base64(df, stock_name, code, panels=None, dpi=None):
+    """渲染技术指标图表，返回PNG图片的base64编码"""
+    return base64.b64encode(render_png(df, stock_name, code, panels, dpi)).decode()
+
+
+def client_spec(panels=None):
+    """
+    浏览器端绘图用的面板定义，与 PANELS 一一对应
+
+    Returns:
+        list: [{name, title, rows, lines: [[列名, 颜色, 图例, 虚线, 透明度, 线宽]], bar, hlines}]
+    """
+    spec = []
+    for name in _check_panels(panels or CHART_CONFIG['panels']):
+        panel = PANELS[name]
+        spec.append({
+            'name': name,
+            'title': panel['title'],
+            'rows': panel.get('rows', 1),
+            'lines': [[col, color, label, style.get('linestyle') == '--', style.get('alpha', 0.8),
+                       style.get('linewidth', STYLE['lines.linewidth'])]
+                      for col, color, label, style in panel['lines']],
+            'bar': list(panel['bar']) if 'bar' in panel else None,
+            'hlines': [list(h) for h in panel.get('hlines', ())],
+        })
+    return spec
+
+
+def _columns(panels):
+    """面板组合用到的数据列，按面板顺序去重"""
+    columns = []
+    for name in panels:
+        columns += [line[0] for line in PANELS[name]['lines']]
+        if 'bar' in PANELS[name]:
+            columns.append(PANELS[name]['bar'][0])
+    return list(dict.fromkeys(columns))
+
+
+def _delta_encode(values, scale):
+    """按 scale 量化成整数后对相邻有效值做差分，NaN/inf 记为 None 且不参与差分"""
+    q = np.round(np.asarray(values, dtype=float) * scale)
+    ok = np.isfinite(q)
+    out = np.full(len(q), None, dtype=object)
+    out[ok] = np.diff(q[ok], prepend=0).astype(np.int64).tolist()
+    return out.tolist()
+
+
+def chart_payload(df, stock_name, code, panels=None, digits=None):
+    """
+    浏览器端绘图用的紧凑数据：时间和各指标列都量化成整数后差分编码
+
+    Args:
+        panels: 要绘制的面板名列表，默认为 CHART_CONFIG['panels']
+        digits: 保留的小数位数，默认为 CHART_CONFIG['digits']
+
+    Returns:
+        dict: {name, code, panels, time: {start, unit, delta}, scale, columns: {列名: 差分序列}}，
+              第i个值等于前面所有差分之和除以 scale
+    """
+    panels = _check_panels(panels or CHART_CONFIG['panels'])
+    scale = 10 ** (CHART_CONFIG['digits'] if digits is None else digits)
+
+    time = None
+    index = df.index.values
+    if np.issubdtype(index.dtype, np.datetime64) and len(index):
+        seconds = index.astype('datetime64[s]').astype(np.int64)
+        steps = np.diff(seconds)
+        unit = next(u for u in (86400, 60, 1) if not (steps % u).any())
+        time = {'start': int(seconds[0]), 'unit': unit, 'delta': (steps // unit).tolist()}
+
+    return {
+        'name': stock_name,
+        'code': code,
+        'panels': list(panels),
+        'time': time,
+        'scale': scale,
+        'columns': {col: _delta_encode(df[col].values, scale) for col in _columns(panels)},
+    }
+
+
+def chart_key(df, stock_name, code, panels=None, dpi=None):
+    """
+    图表的内容哈希：只由绘图用到的数据、标题、面板组合、DPI和渲染器签名决定，输入相同时图片相同
+
+    Returns:
+        str: 32位十六进制字符串
+    """
+    panels = _check_panels(panels or CHART_CONFIG['panels'])
+    columns = _columns(panels)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f'{RENDER_KEY}:{stock_name}:{code}:{",".join(panels)}:{dpi or CHART_CONFIG["dpi"]}'.encode())
+    h.update(pd.util.hash_pandas_object(df[columns], index=True).values.tobytes())
+    return h.hexdigest()
+
+
+def write_png(path, df, stock_name, code, panels=None, dpi=None):
+    """渲染图表并写入文件；先写临时文件再原子替换，并发写同一个文件也不会读到半张图片"""
+    png = render_png(df, stock_name, code, panels, dpi)
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(png)
+    os.replace(tmp, path)
+    return path
+
+
+def prune(chart_dir, keep=(), retention_days=None):
+    """
+    清理外部文件模式下的旧图表文件
+
+    删除 chart_dir 中不在 keep 里、且超过 retention_days 天没有写入或被引用（修改时间）的图片和中断留下的临时文件；
+    保留期内的文件留给仍在使用旧报告的页面和缓存
+
+    Args:
+        keep: 本次报告引用的文件名
+        retention_days: 保留天数，默认为 CHART_CONFIG['retention_days']
+
+    Returns:
+        list: 删除的文件名
+    """
+    days = CHART_CONFIG['retention_days'] if retention_days is None else retention_days
+    cutoff = time.time() - days * 86400
+    keep = set(keep)
+    removed = []
+    for entry in os.scandir(chart_dir):
+        if entry.name in keep or not entry.name.endswith(('.png', '.tmp')) or not entry.is_file():
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed.append(entry.name)
+        except FileNotFoundError:
+            # 同时运行的另一次分析已经删掉了
+            pass
+    return removed
@@ -1,85 +1,93 @@
 # MyTT 麦语言-通达信-同花顺指标实现    https://github.com/mpquant/MyTT
 # V2.1 2021-6-6 新增 BARSLAST函数
 # V2.2 2021-6-8 新增 SLOPE,FORCAST线性回归，和回归预测函数
+# V2.3 SMA 改为向量化递推, 不再逐元素循环, 返回 ndarray
+#      AVEDEV 用滑动窗口视图实现; SLOPE,FORCAST 返回完整序列
+#      0级/1级/2级函数都支持 (股票数,K线数) 的2维矩阵,沿时间轴批量计算
+# V2.4 MA,REF,DIFF,STD,SUM,HHV,LLV,EMA 改由纯NumPy内核 MyTTKernel 实现,导入MyTT不再需要pandas; DIFF 也返回 ndarray
+#      0级函数和SMA,AVEDEV支持 out= 预分配结果数组; float32输入按单精度计算(内存减半)
+#      BARSLAST,LAST 返回完整序列(原来的单个值即序列最后一个); EXIST,EVERY,CROSS 直接由累计和/相邻比较得到
   
-import numpy as np; import pandas as pd
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import MyTTKernel as kn;  from MyTTKernel import RECURSIVE     #0级函数的纯NumPy内核
 
 #------------------ 0级：核心工具函数 --------------------------------------------      
 def RD(N,D=3):   return np.round(N,D)        #四舍五入取3位小数 
-def RET(S,N=1):  return np.array(S)[-N]      #返回序列倒数第N个值,默认返回最后一个
+def RET(S,N=1):  return np.array(S)[...,-N] #返回序列倒数第N个值,默认返回最后一个
 def ABS(S):      return np.abs(S)            #返回N的绝对值
 def MAX(S1,S2):  return np.maximum(S1,S2)    #序列max
 def MIN(S1,S2):  return np.minimum(S1,S2)    #序列min
-         
-def MA(S,N):           #求序列的N日平均值，返回序列                    
-    return pd.Series(S).rolling(N).mean().values
 
-def REF(S, N=1):       #对序列整体下移动N,返回序列(shift后会产生NAN)    
-    return pd.Series(S).shift(N).values  
+def MA(S,N,out=None):  #求序列的N日平均值，返回序列                    
+    return kn.MA(S,N,out)
 
-def DIFF(S, N=1):      #前一个值减后一个值,前面会产生nan 
-    return pd.Series(S).diff(N)  #np.diff(S)直接删除nan，会少一行
+def REF(S, N=1, out=None):  #对序列整体下移动N,返回序列(shift后会产生NAN)    
+    return kn.REF(S,N,out)
 
-def STD(S,N):           #求序列的N日标准差，返回序列    
-    return  pd.Series(S).rolling(N).std(ddof=0).values     
+def DIFF(S, N=1, out=None):  #前一个值减后一个值,前面会产生nan 
+    return kn.DIFF(S,N,out)       #np.diff(S)直接删除nan，会少一行
+
+def STD(S,N,out=None):  #求序列的N日标准差，返回序列    
+    return kn.STD(S,N,out)
 
 def IF(S_BOOL,S_TRUE,S_FALSE):          #序列布尔判断 res=S_TRUE if S_BOOL==True  else  S_FALSE
     return np.where(S_BOOL, S_TRUE, S_FALSE)
 
-def SUM(S, N):                          #对序列求N天累计和，返回序列         
-    return pd.Series(S).rolling(N).sum().values
+def SUM(S, N, out=None):                #对序列求N天累计和，返回序列         
+    return kn.SUM(S,N,out)
 
-def HHV(S,N):                           # HHV(C, 5)  # 最近5天收盘最高价        
-    return pd.Series(S).rolling(N).max().values
+def HHV(S,N,out=None):                  # HHV(C, 5)  # 最近5天收盘最高价        
+    return kn.HHV(S,N,out)
 
-def LLV(S,N):                           # LLV(C, 5)  # 最近5天收盘最低价     
-    return pd.Series(S).rolling(N).min().values
+def LLV(S,N,out=None):                  # LLV(C, 5)  # 最近5天收盘最低价     
+    return kn.LLV(S,N,out)
 
-def EMA(S,N):         #指数移动平均,为了精度 S>4*N  EMA至少需要120周期       
-    return pd.Series(S).ewm(span=N, adjust=False).mean().values    
+def EMA(S,N,out=None):  #指数移动平均,为了精度 S>4*N  EMA至少需要120周期       
+    return kn.EMA(S,N,out)
 
-def SMA(S, N, M=1):   #中国式的SMA,至少需要120周期才精确         
-    K = pd.Series(S).rolling(N).mean()    #先求出平均值 (下面如果有不用循环的办法，能提高性能，望告知)
-    for i in range(N+1, len(S)):  K[i] = (M * S[i] + (N -M) * K[i-1]) / N  # 因为要取K[i-1]，所以 range(N+1, len(S))        
+def SMA(S, N, M=1, out=None):   #中国式的SMA,至少需要120周期才精确         
+    K = MA(S,N,out)                       #先求出平均值, 从N+1起递推 K[i]=(M*S[i]+(N-M)*K[i-1])/N
+    if K.shape[-1]>N+1:  RECURSIVE(K[...,N], kn.asfloat(S)[...,N+1:], M/N, out=K[...,N+1:])
     return K
 
-def AVEDEV(S,N):      #平均绝对偏差  (序列与其平均值的绝对差的平均值)   
-    avedev=pd.Series(S).rolling(N).apply(lambda x: (np.abs(x - x.mean())).mean())    
-    return avedev.values
-
-def SLOPE(S,N,RS=False):               #返S序列N周期回线性回归斜率 (默认只返回斜率,不返回整个直线序列)
-    M=pd.Series(S[-N:]);   poly = np.polyfit(M.index, M.values,deg=1);    Y=np.polyval(poly, M.index); 
-    if RS: return Y[1]-Y[0],Y
-    return Y[1]-Y[0]
+def AVEDEV(S,N,out=None):  #平均绝对偏差  (序列与其平均值的绝对差的平均值)   
+    return kn.window(S,N,lambda W,R: np.abs(W-W.mean(axis=-1,keepdims=True)).mean(axis=-1,out=R),out)   #窗口视图不复制数据
 
+def SLOPE(S,N,RS=False):               #返S序列N周期回线性回归斜率序列 (RS=True时同时返回最后N周期的回归直线)
+    S=np.asarray(S,dtype=float);  X=np.arange(N)-(N-1)/2;  K=np.full(S.shape,np.nan)      #X取中心化的下标,斜率=sum(X*Y)/sum(X*X)
+    if S.shape[-1]>=N: K[...,N-1:]=sliding_window_view(S,N,axis=-1)@X/(X@X)
+    if RS: return K,S[...,-N:].mean(axis=-1,keepdims=True)+K[...,-1:]*X
+    return K
   
 #------------------   1级：应用层函数(通过0级核心函数实现） ----------------------------------
 def COUNT(S_BOOL, N):                  # COUNT(CLOSE>O, N):  最近N天满足S_BOO的天数  True的天数
     return SUM(S_BOOL,N)    
 
 def EVERY(S_BOOL, N):                  # EVERY(CLOSE>O, 5)   最近N天是否都是True
-    R=SUM(S_BOOL, N)
-    return  IF(R==N, True, False)
+    return SUM(np.asarray(S_BOOL,dtype=bool), N)==N        #布尔序列的SUM是累计和相减,精确
   
-def LAST(S_BOOL, A, B):                #从前A日到前B日一直满足S_BOOL条件   
-    if A<B: A=B                        #要求A>B    例：LAST(CLOSE>OPEN,5,3)  5天前到3天前是否都收阳线     
-    return S_BOOL[-A:-B].sum()==(A-B)  #返回单个布尔值    
+def LAST(S_BOOL, A, B):                #从前A日到前B日一直满足S_BOOL条件,返回布尔序列   
+    if A<=B: return np.ones(np.shape(S_BOOL),dtype=bool)     #要求A>B    例：LAST(CLOSE>OPEN,5,3)  5天前到3天前是否都收阳线     
+    return REF(SUM(np.asarray(S_BOOL,dtype=bool), A-B), B)==(A-B)   #[i-A+1,i-B] 这A-B天全部满足; RET(LAST(...)) 即原来的单个布尔值
 
 def EXIST(S_BOOL, N=5):                # EXIST(CLOSE>3010, N=5)  n日内是否存在一天大于3000点
-    R=SUM(S_BOOL,N)    
-    return IF(R>0, True ,False)
+    return SUM(np.asarray(S_BOOL,dtype=bool), N)>0
 
-def BARSLAST(S_BOOL):                  #上一次条件成立到当前的周期  
-    M=np.argwhere(S_BOOL);             # BARSLAST(CLOSE/REF(CLOSE)>=1.1) 上一次涨停到今天的天数
-    return len(S_BOOL)-int(M[-1])-1  if M.size>0 else -1
+def BARSLAST(S_BOOL):                  #上一次条件成立到当前的周期序列,此前从未成立为-1
+    S=np.asarray(S_BOOL,dtype=bool);  I=np.arange(S.shape[-1])     # BARSLAST(CLOSE/REF(CLOSE)>=1.1) 上一次涨停到今天的天数
+    P=np.maximum.accumulate(np.where(S,I,-1),axis=-1)             #截至每根K线最近一次成立的位置
+    return np.where(P>=0, I-P, -1)
 
-def FORCAST(S,N):                      #返S序列N周期回线性回归后的预测值
-    K,Y=SLOPE(S,N,RS=True)
-    return Y[-1]+K
+def FORCAST(S,N):                      #返S序列N周期回线性回归后的预测值序列(回归直线延伸到下一周期)
+    S=np.asarray(S,dtype=float);  M=np.full(S.shape,np.nan)
+    if S.shape[-1]>=N: M[...,N-1:]=sliding_window_view(S,N,axis=-1).mean(axis=-1)
+    return M+SLOPE(S,N)*(N+1)/2                                   #均值点在(N-1)/2处,预测点在N处
   
 def CROSS(S1,S2):                      #判断穿越 CROSS(MA(C,5),MA(C,10))               
-    CROSS_BOOL=IF(S1>S2, True ,False)   
-    return COUNT(CROSS_BOOL>0,2)==1    #上穿：昨天0 今天1   下穿：昨天1 今天0
+    B=np.asarray(S1>S2);  R=np.zeros(B.shape,dtype=bool)
+    R[...,1:]=B[...,1:]!=B[...,:-1]    #上穿：昨天0 今天1   下穿：昨天1 今天0
+    return R
 
 
 
@@ -0,0 +1,260 @@
+# MyTT 基准测试与黄金值回归: 计时每个MyTT函数和 StockAnalyzer 指标计算, 并与存档的黄金输出比对
+#  python MyTTBench.py                                   计时 + 黄金值校验 + 事件函数与原始实现逐前缀比对 + 计划与MyTT一致性校验, JSON结果输出到标准输出
+#  python MyTTBench.py --out now.json --baseline old.json  与上次结果比较,报告加速比和退化(退化或校验失败时退出码为1)
+#  python MyTTBench.py --update-golden                   用 MyTTReference(优化前 MyTT V2.2 的原始公式)重新生成黄金值
+#    黄金值 bench/mytt_golden.npz: GOLDEN_SEED 的250根合成K线逐个函数调用 MyTTReference 的结果, 只返回最后一个值的函数逐个前缀调用;
+#    参照的是 MyTT 原始公式, 没有与通达信/同花顺导出的数据核对过
+#  python MyTTBench.py --fixtures fixtures --codes sh600519 sz000001   用 AshareReplay 录制的真实行情代替合成数据
+import sys, json, time, inspect, argparse, platform, datetime
+import numpy as np
+import MyTT as mt;  import MyTTKernel as kn
+
+GOLDEN='bench/mytt_golden.npz'
+GOLDEN_BARS=250;  GOLDEN_SEED=20240601
+RD_FUNCS={'RD','MACD','RSI','WR','BIAS','BOLL','PSY'}                              #带RD舍入的函数,舍入边界上允许差一个最小单位
+
+class OHLCV:                             #一组K线(1维单只或2维多只),属性名与MyTT参数名一致
+    def __init__(self, O, H, L, C, V): self.O,self.H,self.L,self.C,self.V=O,H,L,C,V
+    def rows(self, i): return OHLCV(*(x[i] for x in (self.O,self.H,self.L,self.C,self.V)))
+
+def synthetic(bars, batch=0, seed=0):    #随机游走行情: 含涨跌停连板和一字板(最高=最低), batch=0 为1维
+    r=np.random.default_rng(seed);  shape=(batch,bars) if batch else (bars,)
+    ret=r.normal(0,0.02,shape);  ret[...,bars//3:bars//3+5]=0.1                     #连续涨停
+    C=10*np.exp(np.cumsum(ret,axis=-1));  O=C*np.exp(r.normal(0,0.005,shape))
+    H=np.maximum(C,O)*(1+r.random(shape)*0.02);  L=np.minimum(C,O)*(1-r.random(shape)*0.02)
+    flat=slice(bars//2,bars//2+8);  O[...,flat]=H[...,flat]=L[...,flat]=C[...,flat]   #一字板
+    return OHLCV(O,H,L,C,r.random(shape)*1e7+1e5)
+
+def recorded(root, codes, bars):         #从AshareReplay录制的行情回放,K线数取各只股票的最小值
+    import Ashare, AshareReplay
+    with AshareReplay.replay(root): data,errors=Ashare.get_prices(codes,count=bars,frequency='1d')
+    if errors: print('回放失败:',errors,file=sys.stderr)
+    n=min(len(df) for df in data.values());  cols={f:np.vstack([df[f].values[-n:] for df in data.values()]) for f in ['open','high','low','close','volume']}
+    return OHLCV(cols['open'],cols['high'],cols['low'],cols['close'],cols['volume']),list(data)
+
+CASES={                                  #每个MyTT函数的调用方式; 新增函数必须在这里登记,否则 cases() 报错
+    'RD':lambda d:(d.C,),          'RET':lambda d:(d.C,),         'ABS':lambda d:(d.C-d.O,),      'MAX':lambda d:(d.C,d.O),
+    'MIN':lambda d:(d.C,d.O),      'MA':lambda d:(d.C,5),         'REF':lambda d:(d.C,1),         'DIFF':lambda d:(d.C,),
+    'STD':lambda d:(d.C,20),       'IF':lambda d:(d.C>d.O,d.C,d.O), 'SUM':lambda d:(d.V,14),      'HHV':lambda d:(d.H,9),
+    'LLV':lambda d:(d.L,9),        'EMA':lambda d:(d.C,12),       'SMA':lambda d:(d.C,14,1),      'AVEDEV':lambda d:(d.C,14),
+    'SLOPE':lambda d:(d.C,20),     'COUNT':lambda d:(d.C>d.O,5),  'EVERY':lambda d:(d.C>d.O,3),   'LAST':lambda d:(d.C>d.O,5,3),
+    'EXIST':lambda d:(d.C>d.O,5),  'BARSLAST':lambda d:(d.C>=d.H,), 'FORCAST':lambda d:(d.C,20),  'CROSS':lambda d:(mt.MA(d.C,5),mt.MA(d.C,10)),
+    'MACD':lambda d:(d.C,),        'KDJ':lambda d:(d.C,d.H,d.L),  'RSI':lambda d:(d.C,),          'WR':lambda d:(d.C,d.H,d.L),
+    'BIAS':lambda d:(d.C,),        'BOLL':lambda d:(d.C,),        'PSY':lambda d:(d.C,),          'CCI':lambda d:(d.C,d.H,d.L),
+    'ATR':lambda d:(d.C,d.H,d.L),  'BBI':lambda d:(d.C,),         'DMI':lambda d:(d.C,d.H,d.L),   'TAQ':lambda d:(d.H,d.L,20),
+    'TRIX':lambda d:(d.C,),        'VR':lambda d:(d.C,d.V),       'EMV':lambda d:(d.H,d.L,d.V),   'DPO':lambda d:(d.C,),
+    'BRAR':lambda d:(d.O,d.C,d.H,d.L), 'DMA':lambda d:(d.C,),     'MTM':lambda d:(d.C,),          'ROC':lambda d:(d.C,),
+}
+
+def cases():                             #MyTT中定义的全部公开函数 -> 调用参数构造函数
+    funcs={n:f for n,f in inspect.getmembers(mt,inspect.isfunction) if f.__module__=='MyTT' and not n.startswith('_')}
+    missing=sorted(set(funcs)-set(CASES))
+    if missing: raise KeyError(f'MyTTBench.CASES 缺少这些函数的调用方式: {missing}')
+    return {n:(funcs[n],CASES[n]) for n in sorted(funcs)}
+
+def outputs(result):                     #函数返回值 -> [ndarray], 多输出指标按顺序展开
+    return [np.asarray(x) for x in (result if isinstance(result,tuple) else (result,))]
+
+def timeit(f, min_time=0.05, repeat=3):  #每轮循环到至少min_time秒,取repeat轮中每次调用的最短时间
+    f();  best=float('inf')
+    for _ in range(repeat):
+        n=0;  t=time.perf_counter()
+        while True:
+            f();  n+=1;  dt=time.perf_counter()-t
+            if dt>=min_time: break
+        best=min(best,dt/n)
+    return best
+
+#------------------ 计时 --------------------------------------------
+def sample(data, bars, batch):          #合成数据直接生成; 录制数据取前batch只的最后bars根,不够时返回None
+    if data is None: return synthetic(bars,batch)
+    if data.C.shape[-1]<bars or data.C.shape[0]<max(batch,1): return None
+    d=data.rows(slice(0,batch)) if batch else data.rows(0)
+    return OHLCV(*(x[...,-bars:] for x in (d.O,d.H,d.L,d.C,d.V)))
+
+def bench_functions(sizes, batches, max_cells, min_time, data=None):   #{函数: {'K线数x股票数': 秒}}, 股票数0为1维; 不支持2维的函数记为None
+    out={}
+    for name,(f,make) in cases().items():
+        out[name]={}
+        for bars in sizes:
+            for batch in batches:
+                d=sample(data,bars,batch) if bars*max(batch,1)<=max_cells else None
+                if d is None: continue
+                args=make(d)
+                with np.errstate(all='ignore'):
+                    try:                 out[name][f'{bars}x{batch}']=timeit(lambda: f(*args),min_time)
+                    except Exception:    out[name][f'{bars}x{batch}']=None
+    return out
+
+def bench_analyzer(sizes, batches, max_cells, min_time):   #StockAnalyzer 逐只计算与批量计算的端到端时间
+    import pandas as pd;  from main import StockAnalyzer
+    out={'calculate_indicators':{},'calculate_indicators_batch':{}}
+    for bars in sizes:
+        for batch in batches:
+            n=max(batch,1)
+            if bars*n>max_cells: continue
+            d=synthetic(bars,n);  codes=[f'sh{600000+i}' for i in range(n)];  index=pd.date_range('2000-01-03',periods=bars,freq='B',name='day')
+            a=StockAnalyzer({c:c for c in codes},count=bars)
+            a.data={c:pd.DataFrame({'open':d.O[i],'close':d.C[i],'high':d.H[i],'low':d.L[i],'volume':d.V[i]},index=index) for i,c in enumerate(codes)}
+            with np.errstate(all='ignore'):
+                out['calculate_indicators'][f'{bars}x{batch}']=timeit(lambda: [a.calculate_indicators(c) for c in codes],min_time)
+                out['calculate_indicators_batch'][f'{bars}x{batch}']=timeit(lambda: a.calculate_indicators_batch(codes),min_time)
+    return out
+
+#------------------ 黄金值 --------------------------------------------
+def golden_outputs(d):                   #({函数名.序号: 数组}, {报错的函数名: 异常信息})
+    res={};  errors={}
+    with np.errstate(all='ignore'):
+        for name,(f,make) in cases().items():
+            try:    out=outputs(f(*make(d)))
+            except Exception as e: errors[name]=f'{type(e).__name__}: {e}';  continue
+            for i,x in enumerate(out): res[f'{name}.{i}']=x
+    return res,errors
+
+PREFIX_FUNCS={'BARSLAST','LAST','SLOPE','FORCAST'}                              #参照实现只返回最后一个值,逐个前缀调用得到完整序列
+
+def prefix_series(f, make, d, name):     #第i个值 = 参照函数在前i+1根K线上的结果; SLOPE,FORCAST 不足N根时为NaN(与现在的实现约定一致)
+    n=d.C.shape[-1];  res=[]
+    for i in range(n):
+        args=make(OHLCV(*(x[:i+1] for x in (d.O,d.H,d.L,d.C,d.V))))
+        res.append(np.nan if name in ('SLOPE','FORCAST') and i+1<args[1] else f(*args))
+    return np.array(res)
+
+def reference_outputs(d):                #MyTTReference 的输出,格式同 golden_outputs
+    import MyTTReference as ref
+    res={};  errors={}
+    with np.errstate(all='ignore'):
+        for name in cases():
+            f=getattr(ref,name);  make=CASES[name]
+            try:    out=[prefix_series(f,make,d,name)] if name in PREFIX_FUNCS else outputs(f(*make(d)))
+            except Exception as e: errors[name]=f'{type(e).__name__}: {e}';  continue
+            for i,x in enumerate(out): res[f'{name}.{i}']=x
+    return res,errors
+
+def update_golden(path=GOLDEN):          #黄金值由参照实现生成,不用被测的 MyTT
+    import os, pandas as pd
+    res,errors=reference_outputs(synthetic(GOLDEN_BARS,seed=GOLDEN_SEED))
+    for name,e in errors.items(): print(f'{name} 报错,未写入黄金值: {e}',file=sys.stderr)
+    os.makedirs(os.path.dirname(path),exist_ok=True)
+    np.savez_compressed(path,**res,__meta__=json.dumps({'bars':GOLDEN_BARS,'seed':GOLDEN_SEED,'reference':'MyTTReference','numpy':np.__version__,
+                        'pandas':pd.__version__,'created':datetime.datetime.now().isoformat(timespec='seconds')}))
+    return path
+
+def _diff(got, exp, atol, rtol=1e-9):    #(是否一致, 最大误差); NaN位置必须完全一致
+    got=np.asarray(got);  exp=np.asarray(exp)
+    if got.shape!=exp.shape: return False,None
+    if got.dtype.kind in 'bO' or exp.dtype.kind in 'bO': return bool(np.array_equal(got,exp)),0.0
+    got=got.astype(float);  exp=exp.astype(float);  fin=np.isfinite(exp)&np.isfinite(got)
+    err=float(np.max(np.abs(got[fin]-exp[fin]),initial=0.0))
+    same=np.array_equal(np.isnan(got),np.isnan(exp)) and np.array_equal(got[~fin],exp[~fin],equal_nan=True)
+    return bool(same and np.allclose(got[fin],exp[fin],rtol=rtol,atol=atol)),err
+
+def check_golden(path=GOLDEN):           #{函数名.序号: {'ok':, 'max_err':}}, 函数报错时键为函数名
+    ref=np.load(path);  meta=json.loads(str(ref['__meta__']))
+    got,errors=golden_outputs(synthetic(meta['bars'],seed=meta['seed']));  res={name:{'ok':False,'max_err':None,'reason':e} for name,e in errors.items()}
+    for key in sorted(set(ref.files)-{'__meta__'}|set(got)):
+        atol=1.01e-3 if key.split('.')[0] in RD_FUNCS else 1e-9
+        if key.split('.')[0] in errors: continue
+        if key not in got or key not in ref.files: res[key]={'ok':False,'max_err':None,'reason':'输出缺失或多出'};  continue
+        ok,err=_diff(got[key],ref[key],atol);  res[key]={'ok':ok,'max_err':err}
+    return res
+
+def check_batch(bars=120, batch=4):      #2维批量结果的每一行应与单独计算该行的结果一致
+    d=synthetic(bars,batch,seed=GOLDEN_SEED);  res={}
+    with np.errstate(all='ignore'):
+        for name,(f,make) in cases().items():
+            try:    B=outputs(f(*make(d)))
+            except Exception: res[name]={'ok':None,'reason':'不支持2维'};  continue
+            ok=True;  err=0.0
+            for i in range(batch):
+                for b,s in zip(B,outputs(f(*make(d.rows(i))))):
+                    if b.ndim==0 or b.shape[0]!=batch: ok=None;  break
+                    o,e=_diff(b[i],s,1e-9);  ok=ok and o;  err=max(err,e or 0.0)
+            res[name]={'ok':ok,'max_err':err} if ok is not None else {'ok':None,'reason':'不支持2维'}
+    return res
+
+EVENT_CASES={                            #user-018 改为返回完整序列的事件函数: 名称 -> (函数名, 由 (布尔序列, 数值序列1, 数值序列2) 构造参数)
+    'BARSLAST':('BARSLAST',lambda S,A,B:(S,)),     'LAST':('LAST',lambda S,A,B:(S,5,3)),   'LAST(A=B)':('LAST',lambda S,A,B:(S,3,3)),
+    'EXIST':('EXIST',lambda S,A,B:(S,5)),           'EVERY':('EVERY',lambda S,A,B:(S,3)),   'CROSS':('CROSS',lambda S,A,B:(A,B)),
+}
+
+def event_inputs(seed=GOLDEN_SEED):      #{名称: (布尔序列, 数值序列1, 数值序列2)}: 随机序列、全真全假、只有首/末根成立、1~3根的短序列; 数值序列前面有NaN
+    r=np.random.default_rng(seed);  res={}
+    for n in (1,2,3,10,60):
+        A=np.cumsum(r.normal(0,1,n));  B=np.cumsum(r.normal(0,1,n));  A[:4]=np.nan;  B[:9]=np.nan
+        first=np.zeros(n,bool);  first[0]=True;  last=np.zeros(n,bool);  last[-1]=True
+        for name,S in {'p0.3':r.random(n)<0.3,'p0.7':r.random(n)<0.7,'none':np.zeros(n,bool),'all':np.ones(n,bool),'first':first,'last':last}.items():
+            res[f'{name}x{n}']=(S,A,B)
+    return res
+
+def check_events(seed=GOLDEN_SEED):      #完整序列的第i个值应等于原始实现(MyTTReference)在前i+1根K线上的结果(单个值或最后一个值)
+    import MyTTReference as ref
+    res={}
+    with np.errstate(all='ignore'):
+        for case,(func,make) in EVENT_CASES.items():
+            bad=[]
+            for key,data in event_inputs(seed).items():
+                got=np.asarray(getattr(mt,func)(*make(*data)))
+                exp=[np.asarray(getattr(ref,func)(*make(*(x[:i+1] for x in data)))).reshape(-1)[-1] for i in range(len(data[0]))]
+                if got.shape!=(len(exp),) or not np.array_equal(got,np.array(exp)): bad.append(key)
+            res[case]={'ok':not bad,'failed':bad}
+    return res
+
+def check_plan(bars=GOLDEN_BARS, batch=0):   #MyTTPlan 计划里的每个2级指标应与直接调用 MyTT 的结果一致
+    import MyTTPlan as mp
+    d=synthetic(bars,batch,seed=GOLDEN_SEED);  nodes=OHLCV(mp.OPEN,mp.HIGH,mp.LOW,mp.CLOSE,mp.VOL);  res={}
+    with np.errstate(all='ignore'):
+        planned={}
+        for name in mp.LEVEL2:           #计划节点不是数组,不能用 outputs() 展开
+            r=getattr(mp,name)(*CASES[name](nodes))
+            for i,x in enumerate(r if isinstance(r,tuple) else (r,)): planned[f'{name}.{i}']=x
+        got=mp.Plan(planned).run(open=d.O,high=d.H,low=d.L,close=d.C,volume=d.V)
+        for name in mp.LEVEL2:
+            for i,exp in enumerate(outputs(getattr(mt,name)(*CASES[name](d)))):
+                ok,err=_diff(got[f'{name}.{i}'],exp,1e-9);  res[f'{name}.{i}']={'ok':ok,'max_err':err}
+    return res
+
+#------------------ 对比 --------------------------------------------
+def compare(now, base, tolerance=0.25):  #{函数: {规模: 加速比}} 和退化列表(比基线慢超过tolerance)
+    speedup={};  regressions=[]
+    for group in ('functions','analyzer'):
+        for name,t in now.get(group,{}).items():
+            for key,sec in t.items():
+                old=base.get(group,{}).get(name,{}).get(key)
+                if not sec or not old: continue
+                s=old/sec;  speedup.setdefault(name,{})[key]=round(s,3)
+                if s<1/(1+tolerance): regressions.append({'name':name,'size':key,'speedup':round(s,3)})
+    return speedup,regressions
+
+def main(argv=None):
+    p=argparse.ArgumentParser(description='MyTT 基准测试与黄金值回归')
+    p.add_argument('--sizes',default='120,1000,10000');  p.add_argument('--batches',default='0,50,500',help='0为1维单只,其余为2维批量的股票数')
+    p.add_argument('--max-cells',type=int,default=2_000_000,help='跳过 K线数x股票数 超过该值的组合');  p.add_argument('--min-time',type=float,default=0.05)
+    p.add_argument('--quick',action='store_true',help='只测120和1000根、1维和50只');  p.add_argument('--no-analyzer',action='store_true')
+    p.add_argument('--fixtures');  p.add_argument('--codes',nargs='*',default=['sh000001','sh600519','sz000001'])
+    p.add_argument('--golden',default=GOLDEN);  p.add_argument('--update-golden',action='store_true')
+    p.add_argument('--baseline');  p.add_argument('--tolerance',type=float,default=0.25);  p.add_argument('--out')
+    a=p.parse_args(argv)
+    if a.update_golden: print('黄金值已写入',update_golden(a.golden),file=sys.stderr);  return 0
+    sizes=[120,1000] if a.quick else [int(x) for x in a.sizes.split(',')];  batches=[0,50] if a.quick else [int(x) for x in a.batches.split(',')]
+    data=None;  source='synthetic'
+    if a.fixtures: data,codes=recorded(a.fixtures,a.codes,max(sizes));  source=f'recorded:{a.fixtures}:{",".join(codes)}';  batches=[b for b in batches if b<=len(codes)]
+    res={'meta':{'python':platform.python_version(),'numpy':np.__version__,'backend':kn.BACKEND,'source':source,'sizes':sizes,'batches':batches,
+                 'time':datetime.datetime.now().isoformat(timespec='seconds')}}
+    res['golden']=check_golden(a.golden);  res['events']=check_events();  res['batch']=check_batch();  res['plan']=check_plan()
+    res['functions']=bench_functions(sizes,batches,a.max_cells,a.min_time,data)
+    if not a.no_analyzer: res['analyzer']=bench_analyzer(sizes,batches,a.max_cells,a.min_time)
+    failed=[k for k,v in res['golden'].items() if not v['ok']]+[k for k,v in res['batch'].items() if v['ok'] is False]+[f'events:{k}' for k,v in res['events'].items() if not v['ok']]+[f'plan:{k}' for k,v in res['plan'].items() if not v['ok']]
+    res['summary']={'golden_failed':failed}
+    if a.baseline:
+        with open(a.baseline,encoding='utf-8') as f: res['speedup'],res['summary']['regressions']=compare(res,json.load(f),a.tolerance)
+    text=json.dumps(res,ensure_ascii=False,indent=1)
+    if a.out:
+        with open(a.out,'w',encoding='utf-8') as f: f.write(text)
+    else: print(text)
+    print(f"黄金值 {len(res['golden'])-len(failed)}/{len(res['golden'])} 一致"+(f", 失败: {failed}" if failed else '')
+          +(f", 性能退化 {len(res['summary']['regressions'])} 项" if a.baseline else ''),file=sys.stderr)
+    return 1 if failed or res['summary'].get('regressions') else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# MyTT 0级核心函数的纯NumPy内核: 滑动窗口视图、累计和、分块前后缀最值、闭式递推, 不依赖pandas
+#  结果与 pandas 的 rolling/shift/diff/ewm(adjust=False) 一致(浮点误差内), 全部返回 ndarray
+#  1维序列或 (股票数,K线数) 的2维矩阵都沿最后一维计算;  set_backend('pandas') 切回pandas实现用于对照, 只有这时才导入pandas
+#  out=  传入预分配的结果数组(形状与输入相同)时直接写入并返回它,不再分配结果;  float32输入按单精度计算和输出,其余输入按float64
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+BACKEND='numpy'
+CHUNK=1<<18                              #窗口类计算(STD/AVEDEV)每段临时数组的元素数上限
+
+def set_backend(name):                   #'numpy' 或 'pandas'
+    global BACKEND
+    if name not in ('numpy','pandas'): raise ValueError(f'未知的计算后端: {name}')
+    BACKEND=name
+
+def asfloat(S):                          #float32保持单精度,其余(整数/布尔/列表/float64)转float64,已是浮点数组时不复制
+    S=np.asarray(S);  return S if S.dtype==np.float32 else S.astype(float,copy=False)
+
+def buffer(S, out=None, dtype=None):     #结果缓冲: 调用方给了out就写入out,否则按输入形状新分配
+    return np.empty(np.shape(S),dtype or S.dtype) if out is None else out
+
+def _pandas(S, f, out=None):             #pandas后端: 1维转Series, 2维转置成每列一只股票的DataFrame,算完再转回
+    import pandas as pd
+    S=np.asarray(S);  R=f(pd.DataFrame(S.T) if S.ndim==2 else pd.Series(S))
+    R=np.array(R.values.T if R.ndim==2 else R.values,dtype=float)                   #pandas返回的数组是只读的,复制一份
+    if out is None: return R
+    out[...]=R;  return out
+
+def window(S, N, reduce, out=None):      #对每个长度N的窗口做reduce(W,R),前N-1个为NaN;窗口视图不复制数据,窗口内有NaN结果即为NaN
+    S=asfloat(S);  R=buffer(S,out);  n=S.shape[-1]-N+1                              #按时间分段reduce,临时数组不超过CHUNK个元素
+    if not 0<N<=S.shape[-1]: R[...]=np.nan;  return R
+    W=sliding_window_view(S,N,axis=-1);  R[...,:N-1]=np.nan;  step=max(1,CHUNK//(N*max(1,S.size//S.shape[-1])))
+    for s in range(0,n,step): reduce(W[...,s:s+step,:],R[...,N-1+s:N-1+s+step])
+    return R
+
+#------------------ 滚动窗口 --------------------------------------------
+def SUM(S, N, out=None):                 #布尔/整数用累计和相减(精确); 浮点直接对窗口求和,避免累计和相减在全零窗口得不到精确的0(VR/BRAR的分母)
+    if BACKEND=='pandas': return _pandas(S,lambda X: X.rolling(N).sum(),out)
+    S=np.asarray(S)
+    if S.dtype.kind not in 'biu': return window(S,N,lambda W,R: W.sum(axis=-1,out=R),out)
+    C=np.cumsum(S,axis=-1,dtype=np.int64);  R=buffer(S,out,float);  R[...]=np.nan
+    if 0<N<=S.shape[-1]: R[...,N-1:]=C[...,N-1:];  R[...,N:]-=C[...,:-N]
+    return R
+
+def MA(S, N, out=None):
+    if BACKEND=='pandas': return _pandas(S,lambda X: X.rolling(N).mean(),out)
+    R=SUM(S,N,out);  return np.divide(R,N,out=R)
+
+def STD(S, N, out=None):                 #总体标准差(ddof=0),每个窗口两遍法计算,没有滑动累计的相消误差
+    if BACKEND=='pandas': return _pandas(S,lambda X: X.rolling(N).std(ddof=0),out)
+    return window(S,N,lambda W,R: W.std(axis=-1,out=R),out)
+
+def _running_max(S, N, out=None):        #van Herk/Gil-Werman: 按N分块求块内前缀最大和后缀最大,任一窗口恰好跨两块,O(n)与N无关
+    L=S.shape[-1];  R=buffer(S,out)
+    if not 0<N<=L: R[...]=np.nan;  return R
+    if N==1: R[...]=S;  return R
+    m=-(-L//N)*N;  P=np.full(S.shape[:-1]+(m,),-np.inf,dtype=S.dtype);  P[...,:L]=S   #尾部补-inf凑整块,不影响最大值
+    B=P.reshape(S.shape[:-1]+(m//N,N))
+    pre=np.maximum.accumulate(B,axis=-1).reshape(P.shape)                            #np.maximum传播NaN,与rolling窗口内有NaN即为NaN一致
+    suf=np.maximum.accumulate(B[...,::-1],axis=-1)[...,::-1].reshape(P.shape)
+    R[...,:N-1]=np.nan;  np.maximum(suf[...,:L-N+1],pre[...,N-1:L],out=R[...,N-1:])
+    return R
+
+def HHV(S, N, out=None):
+    if BACKEND=='pandas': return _pandas(S,lambda X: X.rolling(N).max(),out)
+    return _running_max(asfloat(S),N,out)
+
+def LLV(S, N, out=None):
+    if BACKEND=='pandas': return _pandas(S,lambda X: X.rolling(N).min(),out)
+    R=_running_max(-asfloat(S),N,out);  return np.negative(R,out=R)
+
+#------------------ 平移 --------------------------------------------
+def REF(S, N=1, out=None):               #整体后移N(N<0前移),空出的位置为NaN
+    if BACKEND=='pandas': return _pandas(S,lambda X: X.shift(N),out)
+    S=asfloat(S);  R=buffer(S,out);  L=S.shape[-1];  k=min(abs(N),L)
+    if N>=0: R[...,k:]=S[...,:L-k];  R[...,:k]=np.nan
+    else:    R[...,:L-k]=S[...,k:];  R[...,L-k:]=np.nan
+    return R
+
+def DIFF(S, N=1, out=None):              #out不能与S是同一个数组
+    if BACKEND=='pandas': return _pandas(S,lambda X: X.diff(N),out)
+    S=asfloat(S);  R=REF(S,N,out);  return np.subtract(S,R,out=R)
+
+#------------------ 指数平滑 --------------------------------------------
+def RECURSIVE(Y0, S, A, out=None):   #一阶递推滤波 Y[i]=A*S[i]+(1-A)*Y[i-1], Y[-1]=Y0 ;分块闭式解,没有逐元素的Python循环,2维时沿最后一维
+    S=asfloat(S);  Y0=np.asarray(Y0,dtype=float)[...,None];  D=1.0-A;  Y=buffer(S,out);  L=S.shape[-1]
+    if D<=0: return np.multiply(A,S,out=Y)                 #A=1 直接等于S
+    B=L if D>=1 else max(1,int(300/-np.log(D)))            #块长:保证 D**-B 不溢出(块内按float64累加,单精度只影响存储)
+    P=D**np.arange(1,min(B,L)+1)
+    for s in range(0,L,B):                                 #Y[s+k]=D**k*(Y0+A*sum(S[s+j]/D**j)),每块一次cumsum
+        n=min(B,L-s);  p=P[:n]
+        Y[...,s:s+n]=p*(Y0+np.cumsum(A*S[...,s:s+n]/p,axis=-1));  Y0=Y[...,s+n-1:s+n]
+    return Y
+
+def _ewm_loop(X, A, Y):                  #逐点实现pandas ewm(adjust=False)遇到NaN时的权重规则,只用于中间夹有NaN的序列
+    y=np.nan;  w=1.0
+    for i,x in enumerate(X.tolist()):
+        if y!=y: y=x;  w=1.0
+        else:
+            w*=1.0-A
+            if x==x:
+                if y!=x: y=(w*y+A*x)/(w+A)
+                w=1.0
+        Y[i]=y
+
+def EWM(S, A, out=None):                 #pandas ewm(alpha=A,adjust=False).mean(): 从首个有效值起递推;首个有效值相同且之后无NaN的行一起用闭式解
+    if BACKEND=='pandas': return _pandas(S,lambda X: X.ewm(alpha=A,adjust=False).mean(),out)
+    S=asfloat(S);  R=buffer(S,out);  R[...]=np.nan;  L=S.shape[-1]
+    if not L: return R
+    X=S[None] if S.ndim==1 else S;  Y=R[None] if R.ndim==1 else R;  ok=~np.isnan(X)    #1维当作一行的2维处理
+    first=np.where(ok.any(axis=-1),ok.argmax(axis=-1),L);  clean=ok.sum(axis=-1)==L-first
+    for f in np.unique(first[clean&(first<L)]):
+        rows=np.flatnonzero(clean&(first==f))
+        if len(rows)==len(X): Y[:,f]=X[:,f];  RECURSIVE(X[:,f],X[:,f+1:],A,out=Y[:,f+1:])     #所有行一起算时直接写入结果,不经过花式索引的副本
+        else: Y[rows,f]=X[rows,f];  Y[rows,f+1:]=RECURSIVE(X[rows,f],X[rows,f+1:],A)
+    for i in np.flatnonzero(~clean): _ewm_loop(X[i],A,Y[i])
+    return R
+
+def EMA(S, N, out=None):
+    if BACKEND=='pandas': return _pandas(S,lambda X: X.ewm(span=N,adjust=False).mean(),out)
+    return EWM(S,2.0/(N+1),out)
@@ -0,0 +1,109 @@
+# MyTT 指标计算计划: 声明需要哪些输出列, 引擎把指标展开成以 (算子,输入,参数) 为键的DAG, 公共子表达式只算一次
+#  WR 里的 HHV(HIGH,N)、BIAS 里的 MA、BOLL 里的 STD、ATR 和 DMI 的真实波幅、到处都有的 REF(CLOSE,1) 都只计算一次
+#  plan=Plan({'DIF':MACD(CLOSE)[0], 'RSI':RSI(CLOSE,14)});   out=plan.run(close=c)     # {'DIF':ndarray,'RSI':ndarray}
+#  2级指标直接复用 MyTT 函数的代码(换成本模块的节点算子),算子也直接调用 MyTT,因此结果与逐个调用 MyTT 完全一致
+#  plan.run(out=np.empty((len(plan.names),)+c.shape,np.float32), close=c, ...)   全部输出写入一块预分配的单精度矩阵
+
+import types
+import numpy as np
+import MyTT as mt
+
+class Node:                              #DAG中的一个节点,相同key的节点只计算一次
+    __slots__=('op','args','params','key')
+    def __init__(self, op, args=(), params=()):
+        self.op=op;  self.args=tuple(_node(a) for a in args);  self.params=tuple(params)
+        self.key=(op,tuple(a.key for a in self.args),self.params)
+    def __add__(self, o):      return Node('add',(self,o))
+    def __radd__(self, o):     return Node('add',(o,self))
+    def __sub__(self, o):      return Node('sub',(self,o))
+    def __rsub__(self, o):     return Node('sub',(o,self))
+    def __mul__(self, o):      return Node('mul',(self,o))
+    def __rmul__(self, o):     return Node('mul',(o,self))
+    def __truediv__(self, o):  return Node('div',(self,o))
+    def __rtruediv__(self, o): return Node('div',(o,self))
+    def __neg__(self):         return Node('neg',(self,))
+    def __gt__(self, o):       return Node('gt',(self,o))
+    def __ge__(self, o):       return Node('ge',(self,o))
+    def __lt__(self, o):       return Node('lt',(self,o))
+    def __le__(self, o):       return Node('le',(self,o))
+    def __and__(self, o):      return Node('and',(self,o))
+    def __or__(self, o):       return Node('or',(self,o))
+
+def _node(x): return x if isinstance(x,Node) else Node('const',params=(x,))
+
+OPS={'add':np.add,'sub':np.subtract,'mul':np.multiply,'div':np.true_divide,'neg':np.negative,
+     'gt':np.greater,'ge':np.greater_equal,'lt':np.less,'le':np.less_equal,'and':np.bitwise_and,'or':np.bitwise_or,
+     'MA':mt.MA,'REF':mt.REF,'STD':mt.STD,'SUM':mt.SUM,'HHV':mt.HHV,'LLV':mt.LLV,'EMA':mt.EMA,'SMA':mt.SMA,'AVEDEV':mt.AVEDEV,
+     'ABS':np.abs,'MAX':np.maximum,'MIN':np.minimum,'IF':mt.IF,'RD':np.round,'FILLNA':lambda S,V: np.nan_to_num(S,nan=V)}
+OUT_OPS=set(OPS)-{'IF','FILLNA'}                                                  #支持 out= 直接写入结果缓冲的算子
+
+#------------------ 输入和0级算子(返回节点而不是数组) --------------------------------------------
+CLOSE=Node('input',params=('close',));  OPEN=Node('input',params=('open',));  HIGH=Node('input',params=('high',))
+LOW=Node('input',params=('low',));      VOL=Node('input',params=('volume',))
+
+def MA(S,N):            return Node('MA',(S,),(N,))
+def REF(S,N=1):         return Node('REF',(S,),(N,))
+def STD(S,N):           return Node('STD',(S,),(N,))
+def SUM(S,N):           return Node('SUM',(S,),(N,))
+def HHV(S,N):           return Node('HHV',(S,),(N,))
+def LLV(S,N):           return Node('LLV',(S,),(N,))
+def EMA(S,N):           return Node('EMA',(S,),(N,))
+def SMA(S,N,M=1):       return Node('SMA',(S,),(N,M))
+def AVEDEV(S,N):        return Node('AVEDEV',(S,),(N,))
+def ABS(S):             return Node('ABS',(S,))
+def MAX(S1,S2):         return Node('MAX',(S1,S2))
+def MIN(S1,S2):         return Node('MIN',(S1,S2))
+def IF(S_BOOL,S_TRUE,S_FALSE): return Node('IF',(S_BOOL,S_TRUE,S_FALSE))
+def RD(N,D=3):          return Node('RD',(N,),(D,))
+def FILLNA(S,V):        return Node('FILLNA',(S,),(V,))     #NaN替换为V
+def COUNT(S_BOOL,N):    return SUM(S_BOOL,N)
+
+#------------------ 2级指标: 直接复用 MyTT 的函数体 --------------------------------------------
+#  把 MyTT 2级函数的代码对象重新绑定到本模块的全局名字上,公式里的 EMA/MA/REF/RD... 就解析成上面返回节点的算子
+#  公式只在 MyTT 里维护一份, MyTT 修正公式后计划自动跟着变; 公式用到本模块没有的算子时在构建计划时直接报错
+LEVEL2=('MACD','KDJ','RSI','WR','BIAS','BOLL','PSY','CCI','ATR','BBI','DMI','TAQ','TRIX','VR','EMV','DPO','BRAR','DMA','MTM','ROC')
+
+def _rebind(f):                          #同一份代码,全局名字改从本模块解析
+    g=types.FunctionType(f.__code__,globals(),f.__name__,f.__defaults__,f.__closure__);  g.__doc__=f.__doc__;  return g
+
+for _name in LEVEL2: globals()[_name]=_rebind(getattr(mt,_name))
+
+#------------------ 计划：拓扑排序 + 公共子表达式合并 --------------------------------------------
+class Plan:
+    def __init__(self, outputs):         #outputs: {输出列名: Node}
+        self.steps=[];  index={};  self.requested=0                                 #steps: (算子,参数槽位,参数)
+        def visit(node):
+            self.requested+=1
+            if node.key in index: return index[node.key]
+            slots=[visit(a) for a in node.args]
+            index[node.key]=len(self.steps);  self.steps.append((node.op,slots,node.params))
+            return index[node.key]
+        self.names=list(outputs);  self.outputs=[visit(outputs[n]) for n in self.names]
+        self.last_use={}                                                            #每个中间结果最后一次被用到的步骤,之后即可释放
+        for i,(_,slots,_) in enumerate(self.steps):
+            for s in slots: self.last_use[s]=i
+        for s in self.outputs: self.last_use[s]=len(self.steps)
+
+    def run(self, out=None, dtype=None, **inputs):   #inputs: close=,open=,high=,low=,volume= (1维序列或2维矩阵)
+        #out: 形状为 (输出数,)+输入形状 的预分配矩阵,各输出直接写入 out[k] 并返回out;否则返回 {输出列名: 数组}
+        #dtype: 'float32' 为单精度模式,输入转为float32,中间结果和输出都是单精度;默认跟随out,没有out时为float64
+        dtype=np.dtype(dtype or (out.dtype if out is not None else float))
+        dest={}
+        if out is not None:
+            for k,s in enumerate(self.outputs): dest.setdefault(s,k)
+        vals=[None]*len(self.steps)
+        for i,(op,slots,params) in enumerate(self.steps):
+            o=out[dest[i]] if i in dest else None
+            if op=='input':     vals[i]=np.asarray(inputs[params[0]],dtype=dtype)
+            elif op=='const':   vals[i]=params[0]
+            elif o is not None and op in OUT_OPS: vals[i]=OPS[op](*(vals[s] for s in slots),*params,out=o)
+            else:               vals[i]=OPS[op](*(vals[s] for s in slots),*params)
+            if o is not None and vals[i] is not o: o[...]=vals[i];  vals[i]=o
+            for s in slots:
+                if self.last_use[s]==i: vals[s]=None                                #中间结果不再需要,尽早释放内存
+        if out is None: return {n:vals[s] for n,s in zip(self.names,self.outputs)}
+        for k,s in enumerate(self.outputs):
+            if dest[s]!=k: out[k]=out[dest[s]]                                      #同一个节点对应多个输出列
+        return out
+
+    def __repr__(self): return f'Plan({len(self.names)}个输出, {len(self.steps)}个节点, 合并了{self.requested-len(self.steps)}次重复计算)'
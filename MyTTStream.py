@@ -0,0 +1,165 @@
+# MyTT 流式(增量)指标: 用历史K线初始化状态后,每来一根新K线 O(1) 更新,结果与 MyTT 批量计算一致
+#  s=MACDState().seed(close_history);   dif,dea,macd=s.update(new_close)
+#  python MyTTStream.py  运行 verify(),逐根比对流式结果与 MyTT 批量结果
+
+import math; from collections import deque
+import numpy as np
+import MyTT as mt
+
+NAN=float('nan')
+def _nan(x): return x!=x
+def _rd(x,d=3): return NAN if _nan(x) else round(x,d)                              #与MyTT.RD一致(numpy和python都是四舍六入五成双)
+def _div(a,b):                           #与numpy除法一致: x/0为±inf, 0/0为NaN
+    if b: return a/b
+    return NAN if _nan(a) or _nan(b) or a==0 else math.copysign(math.inf,a)*math.copysign(1.0,b)
+
+#------------------ 0级：滚动窗口状态 --------------------------------------------
+class _State:
+    def seed(self, *history):            #用历史序列初始化,返回self便于链式调用
+        for bar in zip(*history): self.update(*bar)
+        return self
+    def run(self, *history):             #逐根更新并收集全部输出,多输出指标返回元组
+        out=[self.update(*bar) for bar in zip(*history)]
+        if out and isinstance(out[0],tuple): return tuple(np.array(c,dtype=float) for c in zip(*out))
+        return np.array(out,dtype=float)
+
+class _Window:                           #最近N个值的环形缓冲,记录窗口内NaN个数(窗口内有NaN时结果为NaN,与pandas rolling一致)
+    def __init__(self, N): self.N=N;  self.buf=deque(maxlen=N);  self.nans=0
+    def push(self, x):                   #返回被挤出窗口的值(窗口未满返回None)
+        out=self.buf[0] if len(self.buf)==self.N else None
+        if out is not None and _nan(out): self.nans-=1
+        if _nan(x): self.nans+=1
+        self.buf.append(x);  return out
+    def full(self): return len(self.buf)==self.N and self.nans==0
+
+class SUMState(_State):                  #SUM(S,N) 滑动求和,每N次更新重算一次消除累计误差
+    def __init__(self, N): self.w=_Window(N);  self.s=0.0;  self.n=0
+    def update(self, x):
+        out=self.w.push(x);  self.n+=1
+        if not _nan(x): self.s+=x
+        if out is not None and not _nan(out): self.s-=out
+        if self.n%self.w.N==0: self.s=math.fsum(v for v in self.w.buf if not _nan(v))
+        return self.s if self.w.full() else NAN
+
+class MAState(SUMState):                 #MA(S,N)
+    def update(self, x): return SUMState.update(self,x)/self.w.N
+
+class STDState(_State):                  #STD(S,N) 总体标准差, 以窗口首值为参照做平移和,减小相消误差
+    def __init__(self, N): self.w=_Window(N);  self.k=None;  self.s=0.0;  self.q=0.0;  self.n=0
+    def _resum(self):
+        v=[x for x in self.w.buf if not _nan(x)];  self.k=v[0] if v else 0.0
+        self.s=math.fsum(x-self.k for x in v);  self.q=math.fsum((x-self.k)**2 for x in v)
+    def update(self, x):
+        out=self.w.push(x);  self.n+=1
+        if self.k is None: self.k=0.0 if _nan(x) else x
+        if not _nan(x): self.s+=x-self.k;  self.q+=(x-self.k)**2
+        if out is not None and not _nan(out): self.s-=out-self.k;  self.q-=(out-self.k)**2
+        if self.n%self.w.N==0: self._resum()
+        if not self.w.full(): return NAN
+        N=self.w.N;  return math.sqrt(max(self.q/N-(self.s/N)**2,0.0))
+
+class _ExtremeState(_State):             #单调队列求滑动最值,每次更新均摊O(1)
+    def __init__(self, N, better): self.w=_Window(N);  self.q=deque();  self.i=0;  self.better=better
+    def update(self, x):
+        self.w.push(x);  i=self.i;  self.i+=1
+        if not _nan(x):
+            while self.q and not self.better(self.q[-1][1],x): self.q.pop()     #队尾不优于新值的永远不会再成为最值
+            self.q.append((i,x))
+        while self.q and self.q[0][0]<=i-self.w.N: self.q.popleft()
+        return self.q[0][1] if self.w.full() else NAN
+
+class HHVState(_ExtremeState):
+    def __init__(self, N): super().__init__(N,lambda a,b: a>b)
+
+class LLVState(_ExtremeState):
+    def __init__(self, N): super().__init__(N,lambda a,b: a<b)
+
+class REFState(_State):                  #REF(S,N)
+    def __init__(self, N=1): self.buf=deque([NAN]*N,maxlen=N+1)
+    def update(self, x): self.buf.append(x);  return self.buf[0]
+
+class EWMState(_State):                  #pandas ewm(alpha,adjust=False) 的逐点实现,含NaN时的权重规则
+    def __init__(self, alpha): self.a=alpha;  self.y=NAN;  self.w=1.0
+    def update(self, x):
+        if _nan(self.y):  self.y=x;  self.w=1.0;  return self.y
+        self.w*=1.0-self.a
+        if not _nan(x):
+            if self.y!=x: self.y=(self.w*self.y+self.a*x)/(self.w+self.a)
+            self.w=1.0
+        return self.y
+
+class EMAState(EWMState):                #EMA(S,N)
+    def __init__(self, N): super().__init__(2.0/(N+1))
+
+class SMAState(_State):                  #SMA(S,N,M) 前N+1根为N日均值,之后 K=(M*S+(N-M)*K')/N
+    def __init__(self, N, M=1): self.N=N;  self.M=M;  self.ma=MAState(N);  self.k=NAN;  self.i=0
+    def update(self, x):
+        self.k=self.ma.update(x) if self.i<=self.N else (self.M*x+(self.N-self.M)*self.k)/self.N
+        self.i+=1;  return self.k
+
+#------------------ 2级：技术指标状态 --------------------------------------------
+class MACDState(_State):
+    def __init__(self, SHORT=12, LONG=26, M=9): self.s=EMAState(SHORT);  self.l=EMAState(LONG);  self.d=EMAState(M)
+    def update(self, close):
+        dif=self.s.update(close)-self.l.update(close);  dea=self.d.update(dif)
+        return _rd(dif),_rd(dea),_rd((dif-dea)*2)
+
+class KDJState(_State):
+    def __init__(self, N=9, M1=3, M2=3): self.h=HHVState(N);  self.l=LLVState(N);  self.k=EMAState(M1*2-1);  self.d=EMAState(M2*2-1)
+    def update(self, close, high, low):
+        hh=self.h.update(high);  ll=self.l.update(low)
+        rsv=_div(close-ll,hh-ll)*100
+        k=self.k.update(rsv);  d=self.d.update(k)
+        return k,d,k*3-d*2
+
+class RSIState(_State):
+    def __init__(self, N=24): self.ref=REFState(1);  self.up=SMAState(N);  self.all=SMAState(N)
+    def update(self, close):
+        dif=close-self.ref.update(close)
+        up=self.up.update(NAN if _nan(dif) else max(dif,0.0));  al=self.all.update(abs(dif))
+        return _rd(_div(up,al)*100)
+
+class BOLLState(_State):
+    def __init__(self, N=20, P=2): self.ma=MAState(N);  self.std=STDState(N);  self.P=P
+    def update(self, close):
+        mid=self.ma.update(close);  sd=self.std.update(close)
+        return _rd(mid+sd*self.P),_rd(mid),_rd(mid-sd*self.P)
+
+class DMIState(_State):
+    def __init__(self, M1=14, M2=6):
+        self.tr=SUMState(M1);  self.dmp=SUMState(M1);  self.dmm=SUMState(M1);  self.adx=MAState(M2);  self.ref=REFState(M2)
+        self.pc=self.ph=self.pl=NAN                                                 #上一根的收盘/最高/最低
+    def update(self, close, high, low):
+        tr=max(high-low,abs(high-self.pc),abs(low-self.pc)) if not _nan(self.pc) else NAN
+        hd=high-self.ph;  ld=self.pl-low
+        tr=self.tr.update(tr)
+        dmp=self.dmp.update(hd if hd>0 and hd>ld else 0.0);  dmm=self.dmm.update(ld if ld>0 and ld>hd else 0.0)
+        pdi=_div(dmp*100,tr);  mdi=_div(dmm*100,tr)
+        adx=self.adx.update(_div(abs(mdi-pdi),pdi+mdi)*100)
+        self.pc,self.ph,self.pl=close,high,low
+        return pdi,mdi,adx,(adx+self.ref.update(adx))/2
+
+#------------------ 校验：流式结果逐根对齐 MyTT 批量结果 --------------------------------------------
+def verify(n=300, seed=0, warmup=150):   #前warmup根用于seed,其余逐根update,全程与MyTT比对,不一致时抛AssertionError
+    r=np.random.default_rng(seed);  C=10+np.cumsum(r.normal(0,0.1,n));  H=C+r.random(n)*0.2;  L=C-r.random(n)*0.2
+    C[n//2:n//2+12]=H[n//2:n//2+12]=L[n//2:n//2+12]=C[n//2]                           #插入一段一字板,覆盖最高=最低(0/0)的情况
+    RD=1.01e-3                                                                     #带RD的指标在舍入边界上允许差一个最小单位
+    with np.errstate(divide='ignore',invalid='ignore'): cases={
+        'MA':(lambda: MAState(10),(C,),mt.MA(C,10),1e-9),       'SUM':(lambda: SUMState(10),(C,),mt.SUM(C,10),1e-9),
+        'STD':(lambda: STDState(20),(C,),mt.STD(C,20),1e-9),    'HHV':(lambda: HHVState(9),(H,),mt.HHV(H,9),0),
+        'LLV':(lambda: LLVState(9),(L,),mt.LLV(L,9),0),         'REF':(lambda: REFState(3),(C,),mt.REF(C,3),0),
+        'EMA':(lambda: EMAState(12),(C,),mt.EMA(C,12),1e-9),    'SMA':(lambda: SMAState(14,1),(C,),mt.SMA(C,14,1),1e-9),
+        'MACD':(MACDState,(C,),mt.MACD(C),RD),                  'KDJ':(KDJState,(C,H,L),mt.KDJ(C,H,L),1e-9),
+        'RSI':(lambda: RSIState(14),(C,),mt.RSI(C,14),RD),      'BOLL':(BOLLState,(C,),mt.BOLL(C),RD),
+        'DMI':(DMIState,(C,H,L),mt.DMI(C,H,L),1e-9),
+    }
+    for name,(make,args,expected,atol) in cases.items():
+        state=make();  head=state.run(*(a[:warmup] for a in args));  tail=state.run(*(a[warmup:] for a in args))
+        for h,t,e in zip(*(x if isinstance(x,tuple) else (x,) for x in (head,tail,expected))):
+            g=np.concatenate([h,t]);  e=np.asarray(e,dtype=float)
+            assert np.array_equal(np.isnan(g),np.isnan(e)) and np.allclose(g,e,rtol=1e-9,atol=atol,equal_nan=True),\
+                f'{name} 流式结果与MyTT不一致: 最大误差 {np.nanmax(np.abs(g-e))}'
+    return True
+
+if __name__ == '__main__':
+    verify();   print('流式指标与 MyTT 批量结果一致')
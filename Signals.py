@@ -0,0 +1,160 @@
+"""
+规则化的交易信号
+
+信号规则以表格（RULES）声明，每条规则的条件在整段历史上一次算成布尔数组；
+输入的每列可以是1维 (K线数,) 或2维 (股票数, K线数)，所有运算都沿最后一维，没有逐根K线的Python循环。
+evaluate 的结果是 (规则数, ...) 的事件矩阵，报告、选股和回测都从它取数
+"""
+import numpy as np
+import pandas as pd
+
+# 条件运算：参数是列名或常数，('and', 条件, 条件, ...) 表示同时满足
+#   above/below:       当根K线 a > b / a < b
+#   cross_up/cross_down: 当根 a > b 且前一根 a <= b / 当根 a < b 且前一根 a >= b，第一根K线没有前值，不触发
+# 规则：(分组, 信号名, 条件, 提示文字)。同一分组内按顺序互斥，前面的规则触发时后面的规则不再触发
+RULES = [
+    ('MACD', 'macd_golden_cross', ('cross_up', 'MACD', 0), "MACD金叉形成，可能上涨"),
+    ('MACD', 'macd_dead_cross', ('cross_down', 'MACD', 0), "MACD死叉形成，可能下跌"),
+    ('KDJ', 'kdj_oversold', ('and', ('below', 'K', 20), ('below', 'D', 20)), "KDJ超卖，可能反弹"),
+    ('KDJ', 'kdj_overbought', ('and', ('above', 'K', 80), ('above', 'D', 80)), "KDJ超买，注意回调"),
+    ('RSI', 'rsi_oversold', ('below', 'RSI', 20), "RSI超卖，可能反弹"),
+    ('RSI', 'rsi_overbought', ('above', 'RSI', 80), "RSI超买，注意回调"),
+    ('BOLL', 'boll_break_up', ('above', 'close', 'BOLL_UP'), "股价突破布林上轨，超买状态"),
+    ('BOLL', 'boll_break_low', ('below', 'close', 'BOLL_LOW'), "股价跌破布林下轨，超卖状态"),
+    ('DMI', 'dmi_golden_cross', ('cross_up', 'PDI', 'MDI'), "DMI金叉，上升趋势形成"),
+    ('DMI', 'dmi_dead_cross', ('cross_down', 'PDI', 'MDI'), "DMI死叉，下降趋势形成"),
+    ('VR', 'vr_active', ('above', 'VR', 160), "VR大于160，市场活跃度高"),
+    ('VR', 'vr_inactive', ('below', 'VR', 40), "VR小于40，市场活跃度低"),
+    ('ROC', 'roc_cross_up', ('cross_up', 'ROC', 'MAROC'), "ROC上穿均线，上升动能增强"),
+    ('ROC', 'roc_cross_down', ('cross_down', 'ROC', 'MAROC'), "ROC下穿均线，上升动能减弱"),
+]
+
+NAMES = [rule[1] for rule in RULES]
+
+
+def _previous(X):
+    """前一根K线的值，第一根为NaN（与NaN比较恒为False，所以第一根不会触发交叉）"""
+    P = np.empty_like(X)
+    P[..., 0] = np.nan
+    P[..., 1:] = X[..., :-1]
+    return P
+
+
+def _cross_up(a, b):
+    return (a > b) & (_previous(a) <= _previous(b))
+
+
+def _cross_down(a, b):
+    return (a < b) & (_previous(a) >= _previous(b))
+
+
+OPS = {
+    'above': np.greater,
+    'below': np.less,
+    'cross_up': _cross_up,
+    'cross_down': _cross_down,
+}
+
+
+def _condition(data, condition, cache):
+    """计算一个条件的布尔数组；同一次计算中用到的列只取一次"""
+    op, *args = condition
+    if op == 'and':
+        masks = [_condition(data, arg, cache) for arg in args]
+        return np.logical_and.reduce(masks)
+    values = []
+    for arg in args:
+        if isinstance(arg, str):
+            if arg not in cache:
+                cache[arg] = np.asarray(data[arg], dtype=float)
+            arg = cache[arg]
+        values.append(np.asarray(arg, dtype=float))
+    a, b = np.broadcast_arrays(*values)
+    return OPS[op](a, b)
+
+
+def evaluate(data, rules=None, exclusive=True):
+    """
+    在整段历史上计算全部信号
+
+    Args:
+        data: 列名到数组的映射（DataFrame或dict），每列形状为 (K线数,) 或 (股票数, K线数)
+        rules: 规则表，默认为 RULES
+        exclusive: 为True时同一分组内前面的规则触发后，后面的规则不再触发（与逐条 if/elif 判断一致）
+
+    Returns:
+        ndarray: (规则数, ...) 的布尔事件矩阵，[i, ..., t] 表示第i条规则在第t根K线触发
+    """
+    rules = RULES if rules is None else rules
+    cache = {}
+    events = np.stack([_condition(data, rule[2], cache) for rule in rules])
+    if exclusive:
+        taken = {}
+        for i, (group, *_) in enumerate(rules):
+            if group in taken:
+                events[i] &= ~taken[group]
+                taken[group] |= events[i]
+            else:
+                taken[group] = events[i].copy()
+    return events
+
+
+def messages(events, rules=None, t=-1):
+    """
+    第t根K线（默认最后一根）上触发的信号提示，按规则表顺序
+
+    Args:
+        events: 一只股票的事件矩阵 (规则数, K线数)
+
+    Returns:
+        list: 提示文字
+    """
+    rules = RULES if rules is None else rules
+    return [rules[i][3] for i in np.flatnonzero(events[:, t])]
+
+
+def event_frame(df, rules=None):
+    """一只股票全部历史的事件表：行为K线，列为信号名，供回测使用"""
+    rules = RULES if rules is None else rules
+    events = evaluate(df, rules)
+    return pd.DataFrame(events.T, index=df.index, columns=[rule[1] for rule in rules])
+
+
+def screen(frames, rules=None):
+    """
+    选股：多只股票最新一根K线上的信号
+
+    各股票只取最后两根K线（交叉需要前值，不足两根时补NaN）堆叠成 (股票数, 2) 的矩阵，一次算完全部规则
+
+    Args:
+        frames: {股票代码: 含技术指标的DataFrame}
+
+    Returns:
+        DataFrame: 行为股票代码，列为信号名；没有股票时为空表
+    """
+    rules = RULES if rules is None else rules
+    names = [rule[1] for rule in rules]
+    codes = list(frames)
+    if not codes:
+        return pd.DataFrame(columns=names, dtype=bool)
+    columns = {col for rule in rules for col in _columns(rule[2])}
+    data = {col: np.vstack([_last_two(frames[code][col].values) for code in codes]) for col in columns}
+    events = evaluate(data, rules)
+    return pd.DataFrame(events[..., -1].T, index=codes, columns=names)
+
+
+def _last_two(values):
+    """最后两根K线的值；不足两根时前面补NaN（与NaN比较恒为False，不会触发信号）"""
+    out = np.full(2, np.nan)
+    tail = values[-2:]
+    if len(tail):
+        out[-len(tail):] = tail
+    return out
+
+
+def _columns(condition):
+    """条件用到的列名"""
+    op, *args = condition
+    if op == 'and':
+        return [col for arg in args for col in _columns(arg)]
+    return [arg for arg in args if isinstance(arg, str)]
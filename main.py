@@ -1,81 +1,199 @@
-import base64
+import asyncio
+import glob
+import hashlib
+import json
+import multiprocessing
 import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
-from io import BytesIO
 from string import Template
-import matplotlib
-# 在导入 pyplot 之前设置后端为 Agg（非交互式）
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
 import pytz
-from matplotlib.axes import Axes
 import numpy as np
+import pandas as pd
 from dotenv import load_dotenv
 
 import Ashare as as_api
-import MyTT as mt
+import Charts
+import MyTTPlan as mp
+import Signals
 from Deepseek import DeepseekAnalyzer
 
+# 图表模式：'png' 服务端渲染PNG内嵌到报告中；'file' 渲染成按内容哈希命名的外部PNG文件，报告只引用文件；
+# 'client' 只内嵌紧凑的指标数据，由浏览器绘制
+CHART_MODES = ('png', 'file', 'client')
+
+# 流式报告中已经生成、等待消费方取走的股票片段数上限
+REPORT_QUEUE_SIZE = 4
+
+_chart_pools = {}
+_chart_pools_lock = threading.Lock()
+
 # 加载 .env 文件
 load_dotenv()
 
 def generate_trading_signals(df):
-    """生成交易信号和建议"""
-    signals = []
-
-    # MACD信号
-    if df['MACD'].iloc[-1] > 0 >= df['MACD'].iloc[-2]:
-        signals.append("MACD金叉形成，可能上涨")
-    elif df['MACD'].iloc[-1] < 0 <= df['MACD'].iloc[-2]:
-        signals.append("MACD死叉形成，可能下跌")
-
-    # KDJ信号
-    if df['K'].iloc[-1] < 20 and df['D'].iloc[-1] < 20:
-        signals.append("KDJ超卖，可能反弹")
-    elif df['K'].iloc[-1] > 80 and df['D'].iloc[-1] > 80:
-        signals.append("KDJ超买，注意回调")
-
-    # RSI信号
-    if df['RSI'].iloc[-1] < 20:
-        signals.append("RSI超卖，可能反弹")
-    elif df['RSI'].iloc[-1] > 80:
-        signals.append("RSI超买，注意回调")
-
-    # BOLL带信号
-    if df['close'].iloc[-1] > df['BOLL_UP'].iloc[-1]:
-        signals.append("股价突破布林上轨，超买状态")
-    elif df['close'].iloc[-1] < df['BOLL_LOW'].iloc[-1]:
-        signals.append("股价跌破布林下轨，超卖状态")
-
-    # DMI信号
-    if df['PDI'].iloc[-1] > df['MDI'].iloc[-1] and df['PDI'].iloc[-2] <= df['MDI'].iloc[-2]:
-        signals.append("DMI金叉，上升趋势形成")
-    elif df['PDI'].iloc[-1] < df['MDI'].iloc[-1] and df['PDI'].iloc[-2] >= df['MDI'].iloc[-2]:
-        signals.append("DMI死叉，下降趋势形成")
-
-    # 成交量分析
-    if df['VR'].iloc[-1] > 160:
-        signals.append("VR大于160，市场活跃度高")
-    elif df['VR'].iloc[-1] < 40:
-        signals.append("VR小于40，市场活跃度低")
-
-    # ROC动量分析
-    if df['ROC'].iloc[-1] > df['MAROC'].iloc[-1] and df['ROC'].iloc[-2] <= df['MAROC'].iloc[-2]:
-        signals.append("ROC上穿均线，上升动能增强")
-    elif df['ROC'].iloc[-1] < df['MAROC'].iloc[-1] and df['ROC'].iloc[-2] >= df['MAROC'].iloc[-2]:
-        signals.append("ROC下穿均线，上升动能减弱")
-
+    """生成交易信号和建议：按 Signals.RULES 判断最后一根K线，只需最后两根K线（交叉要用前值）"""
+    signals = Signals.messages(Signals.evaluate(df.iloc[-2:]))
     return signals if signals else ["当前无明显交易信号"]
 
 
-def plot_to_base64(fig):
-    buffer = BytesIO()
-    fig.savefig(buffer, format='png', bbox_inches='tight', dpi=100)
-    buffer.seek(0)
-    image_base64 = base64.b64encode(buffer.getvalue()).decode()
-    plt.close(fig)
-    return image_base64
+def _build_indicator_plan():
+    """
+    声明全部技术指标输出列，构建共享公共子表达式的计算计划
+
+    Returns:
+        MyTTPlan.Plan: 输出列与 compute_indicators 返回的列一致
+    """
+    close, high, low, volume = mp.CLOSE, mp.HIGH, mp.LOW, mp.VOL
+
+    # 计算基础指标
+    dif, dea, macd = mp.MACD(close)
+    k, d, j = mp.KDJ(close, high, low)
+    upper, mid, lower = mp.BOLL(close)
+    rsi = mp.FILLNA(mp.RSI(close, N=14), 50)
+    psy, psyma = mp.PSY(close)
+    wr, wr1 = mp.WR(close, high, low)
+    bias1, bias2, bias3 = mp.BIAS(close)
+    cci = mp.CCI(close, high, low)
+
+    # 计算ATR和EMV
+    atr = mp.ATR(close, high, low)
+    emv, maemv = mp.EMV(high, low, volume)
+
+    # 新增指标计算
+    dpo, madpo = mp.DPO(close)  # 区间振荡
+    trix, trma = mp.TRIX(close)  # 三重指数平滑平均
+    pdi, mdi, adx, adxr = mp.DMI(close, high, low)  # 动向指标
+    vr = mp.VR(close, volume)  # 成交量比率
+    ar, br = mp.BRAR(mp.OPEN, close, high, low)  # 人气意愿指标
+    roc, maroc = mp.ROC(close)  # 变动率
+    mtm, mtmma = mp.MTM(close)  # 动量指标
+    dif_dma, difma_dma = mp.DMA(close)  # 平行线差指标
+
+    return mp.Plan({
+        'MACD': macd,
+        'DIF': dif,
+        'DEA': dea,
+        'K': k,
+        'D': d,
+        'J': j,
+        'BOLL_UP': upper,
+        'BOLL_MID': mid,
+        'BOLL_LOW': lower,
+        'RSI': rsi,
+        'PSY': psy,
+        'PSYMA': psyma,
+        'WR': wr,
+        'WR1': wr1,
+        'BIAS1': bias1,
+        'BIAS2': bias2,
+        'BIAS3': bias3,
+        'CCI': cci,
+        'MA5': mp.MA(close, 5),
+        'MA10': mp.MA(close, 10),
+        'MA20': mp.MA(close, 20),
+        'MA60': mp.MA(close, 60),
+        'ATR': atr,
+        'EMV': emv,
+        'MAEMV': maemv,
+        'DPO': dpo,
+        'MADPO': madpo,
+        'TRIX': trix,
+        'TRMA': trma,
+        'PDI': pdi,
+        'MDI': mdi,
+        'ADX': adx,
+        'ADXR': adxr,
+        'VR': vr,
+        'AR': ar,
+        'BR': br,
+        'ROC': roc,
+        'MAROC': maroc,
+        'MTM': mtm,
+        'MTMMA': mtmma,
+        'DIF_DMA': dif_dma,
+        'DIFMA_DMA': difma_dma,
+    })
+
+
+# 模块加载时构建一次，之后每次计算只按拓扑顺序执行去重后的节点
+INDICATOR_PLAN = _build_indicator_plan()
+# 指标计划的签名，指标公式或参数变化后磁盘上的旧指标缓存自动失效
+INDICATOR_PLAN_KEY = hashlib.blake2b(repr((INDICATOR_PLAN.names, INDICATOR_PLAN.steps)).encode(),
+                                     digest_size=8).hexdigest()
+
+
+def compute_indicators(close, open_price, high, low, volume):
+    """
+    计算全部技术指标
+
+    输入既可以是单只股票的1维数组，也可以是 (股票数, K线数) 的2维矩阵。
+    各指标共用的中间结果（REF(CLOSE,1)、HHV/LLV、MA、STD、真实波幅等）只计算一次
+
+    Returns:
+        dict: {指标列名: 与输入同形状的数组}
+    """
+    return INDICATOR_PLAN.run(close=close, open=open_price, high=high, low=low, volume=volume)
+
+
+def compute_indicator_matrix(close, open_price, high, low, volume, dtype=None, out=None):
+    """
+    计算全部技术指标，结果写入一块连续的指标矩阵
+
+    Args:
+        dtype: 'float32' 为单精度模式，指标矩阵和中间结果的内存减半；默认 float64
+        out: 预分配的 (指标数,)+输入形状 矩阵，给出时直接写入其中，不再分配结果
+
+    Returns:
+        np.ndarray: 第k行是 INDICATOR_PLAN.names[k] 指标
+    """
+    if out is None:
+        out = np.empty((len(INDICATOR_PLAN.names),) + np.shape(close), dtype=dtype or float)
+    return INDICATOR_PLAN.run(out=out, dtype=dtype, close=close, open=open_price, high=high, low=low,
+                              volume=volume)
+
+
+def indicator_frame(bars, matrix):
+    """
+    把 (指标数, K线数) 的指标矩阵拼接到K线数据后面
+
+    指标列直接引用矩阵内存（pandas 按列存储，矩阵的每一行正好是一列），不逐列复制。
+    不用 pd.concat：没有写时复制的 pandas 2.x 拼接时会把同类型的列合并成一块，整个矩阵被复制一遍；
+    逐列插入K线列只新增小块，指标矩阵仍是独立的一块
+
+    Returns:
+        DataFrame: K线列 + 全部指标列
+    """
+    frame = pd.DataFrame(matrix.T, index=bars.index, columns=INDICATOR_PLAN.names, copy=False)
+    for i, col in enumerate(bars.columns):
+        frame.insert(i, col, bars[col].values)
+    return frame
+
+
+def _chart_pool(workers):
+    """
+    图表渲染进程池，每种进程数只创建一次，之后的报告复用同一个进程池
+
+    子进程用 spawn 方式启动：服务端在多个线程里处理请求，fork 多线程的进程可能让子进程死锁
+    """
+    with _chart_pools_lock:
+        if workers not in _chart_pools:
+            _chart_pools[workers] = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+        return _chart_pools[workers]
+
+
+def _run_loop(loop, task):
+    """在当前（后台）线程里运行事件循环直到 task 结束；事件循环由调用方关闭"""
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(task)
+    except asyncio.CancelledError:
+        pass
+    finally:
+        loop.run_until_complete(loop.shutdown_default_executor())
 
 
 def _get_value_class(value):
@@ -95,29 +213,84 @@ def _get_value_class(value):
         return 'neutral'
 
 
+def _worker_count(value, env_name, default):
+    """并发数：参数优先，其次环境变量，最后默认值"""
+    if value is None:
+        value = os.getenv(env_name)
+    return int(value) if value not in (None, '') else default
+
+
 def _generate_table_row(key, value):
     """生成表格行HTML，包含样式"""
     value_class = _get_value_class(value)
     return f'<tr><td>{key}</td><td class="{value_class}">{value}</td></tr>'
 
 
+def _chart_mode(value):
+    """图表模式：参数优先，其次环境变量 CHART_MODE，默认 'png'"""
+    mode = value or os.getenv('CHART_MODE') or 'png'
+    if mode not in CHART_MODES:
+        raise ValueError(f"未知的图表模式: {mode}，可选: {CHART_MODES}")
+    return mode
+
+
+def _image_chart_html(stock_name, code, src):
+    """服务端渲染的图表：src 为图片地址或 data URI"""
+    return f"""<img src="{src}" 
+                     alt="{stock_name} ({code})技术分析图表"
+                     loading="lazy">"""
+
+
+def _client_chart_html(stock_name, code, payload):
+    """浏览器端绘制的图表：空canvas加紧跟其后的JSON数据，由 report_charts.js 绘制"""
+    data = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+    return f"""<canvas class="indicator-chart" aria-label="{stock_name} ({code})技术分析图表"></canvas>
+                <script type="application/json" class="chart-data">{data}</script>"""
+
+
+def _client_chart_scripts():
+    """浏览器端绘图需要的面板定义和绘图脚本，整份报告只嵌入一次"""
+    with open('static/js/report_charts.js', 'r', encoding='utf-8') as f:
+        script = f.read()
+    panels = json.dumps(Charts.client_spec(), ensure_ascii=False, separators=(',', ':'))
+    return f"<script>const CHART_PANELS = {panels};</script>\n<script>\n{script}</script>"
+
+
+def plot_indicators(df, stock_name, code, panels=None, dpi=None):
+    """
+    绘制技术分析图表
+
+    模块级函数，不依赖 StockAnalyzer 实例，可以直接提交给进程池并行渲染；
+    字体和图表模板由 Charts 在每个进程内只初始化一次
+
+    Args:
+        panels: 要绘制的面板名列表，默认读取环境变量 CHART_PANELS，都没有时绘制全部面板
+        dpi: 图片分辨率，默认读取环境变量 CHART_DPI，都没有时为100
+
+    Returns:
+        str: PNG图片的base64编码
+    """
+    return Charts.render_base64(df, stock_name, code, panels, dpi)
+
+
 class StockAnalyzer:
-    def __init__(self, _stock_info, count=120):
+    def __init__(self, _stock_info, count=120, precision=None, cache_dir=None):
         """
         初始化股票分析器
 
         Args:
             _stock_info: 股票信息字典
             count: 获取的数据条数
+            precision: 指标计算精度 'float64' 或 'float32'，默认读取环境变量 INDICATOR_PRECISION
+            cache_dir: 指标缓存落盘目录，默认读取环境变量 INDICATOR_CACHE_DIR，都没有时只缓存在内存中
         """
         self.stock_codes = list(_stock_info.values())
         self.stock_names = _stock_info
         self.count = count
+        self.precision = np.dtype(precision or os.getenv('INDICATOR_PRECISION', 'float64'))
+        self.cache_dir = cache_dir or os.getenv('INDICATOR_CACHE_DIR') or None
         self.data = {}
-        
-        # 设置matplotlib的配置
-        plt.rcParams['font.sans-serif'] = ['SimHei']
-        plt.rcParams['axes.unicode_minus'] = False
+        self._indicators = {}  # {股票代码: (K线指纹, 含技术指标的DataFrame)}
         
         # 从环境变量中读取配置
         deepseek_api_key = os.getenv('DEEPSEEK_API_KEY')
@@ -131,250 +304,141 @@ class StockAnalyzer:
         return {v: k for k, v in self.stock_names.items()}.get(code, code)
 
     def fetch_data(self):
-        """获取股票数据"""
-        for code in self.stock_codes:
-            stock_name = self.get_stock_name(code)
+        """并发获取所有股票数据"""
+        data, errors = as_api.get_prices(self.stock_codes, count=self.count, frequency='1d')
+        self.data.update(data)
+        for code, e in errors.items():
+            print(f"获取股票 {self.get_stock_name(code)} ({code}) 数据失败: {str(e)}")
+
+    def _fingerprint(self, bars):
+        """K线数据的指纹：索引和全部数值、计算精度、指标计划都相同时才视为同一份数据"""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f'{INDICATOR_PLAN_KEY}:{self.precision}:{",".join(bars.columns)}'.encode())
+        h.update(pd.util.hash_pandas_object(bars, index=True).values.tobytes())
+        return h.hexdigest()
+
+    def _cache_path(self, code, fingerprint):
+        return os.path.join(self.cache_dir, f'{code}-{fingerprint}.pkl')
+
+    def _cached_indicators(self, code):
+        """
+        查找指标缓存，先查内存再查磁盘
+
+        Returns:
+            tuple: (K线指纹, 缓存的DataFrame，未命中时为None)
+        """
+        fingerprint = self._fingerprint(self.data[code])
+        cached = self._indicators.get(code)
+        if cached and cached[0] == fingerprint:
+            return fingerprint, cached[1]
+        if self.cache_dir and os.path.exists(self._cache_path(code, fingerprint)):
             try:
-                df = as_api.get_price(code, count=self.count, frequency='1d')
-                self.data[code] = df
+                df = pd.read_pickle(self._cache_path(code, fingerprint))
+                self._indicators[code] = (fingerprint, df)
+                return fingerprint, df
             except Exception as e:
-                print(f"获取股票 {stock_name} ({code}) 数据失败: {str(e)}")
+                print(f"读取指标缓存 {code} 失败，重新计算: {str(e)}")
+        return fingerprint, None
+
+    def _store_indicators(self, code, fingerprint, df):
+        """写入指标缓存；落盘时先写临时文件再原子替换，并删除该股票旧指纹的缓存文件"""
+        self._indicators[code] = (fingerprint, df)
+        if not self.cache_dir:
+            return
+        path = self._cache_path(code, fingerprint)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # 同一进程的多个线程可能同时缓存同一份数据，临时文件名带上线程号
+            tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            df.to_pickle(tmp)
+            os.replace(tmp, path)
+            for old in glob.glob(os.path.join(glob.escape(self.cache_dir), f'{glob.escape(code)}-*.pkl')):
+                if old != path:
+                    os.remove(old)
+        except OSError as e:
+            print(f"写入指标缓存 {code} 失败: {str(e)}")
+
+    def invalidate_indicators(self, code=None):
+        """清除内存中的指标缓存（code为None时清除全部），磁盘缓存按指纹自动失效"""
+        if code is None:
+            self._indicators.clear()
+        else:
+            self._indicators.pop(code, None)
 
     def calculate_indicators(self, code):
-        """计算技术指标"""
-        df = self.data[code].copy()
-        close = np.array(df['close'])
-        open_price = np.array(df['open'])
-        high = np.array(df['high'])
-        low = np.array(df['low'])
-        volume = np.array(df['volume'])
-
-        # 计算基础指标
-        dif, dea, macd = mt.MACD(close)
-        k, d, j = mt.KDJ(close, high, low)
-        upper, mid, lower = mt.BOLL(close)
-        rsi = mt.RSI(close, N=14)
-        rsi = np.nan_to_num(rsi, nan=50)
-        psy, psyma = mt.PSY(close)
-        wr, wr1 = mt.WR(close, high, low)
-        bias1, bias2, bias3 = mt.BIAS(close)
-        cci = mt.CCI(close, high, low)
-
-        # 计算均线
-        ma5 = mt.MA(close, 5)
-        ma10 = mt.MA(close, 10)
-        ma20 = mt.MA(close, 20)
-        ma60 = mt.MA(close, 60)
-
-        # 计算ATR和EMV
-        atr = mt.ATR(close, high, low)
-        emv, maemv = mt.EMV(high, low, volume)
-
-        # 新增指标计算
-        dpo, madpo = mt.DPO(close)  # 区间振荡
-        trix, trma = mt.TRIX(close)  # 三重指数平滑平均
-        pdi, mdi, adx, adxr = mt.DMI(close, high, low)  # 动向指标
-        vr = mt.VR(close, volume)  # 成交量比率
-        ar, br = mt.BRAR(open_price, close, high, low)  # 人气意愿指标
-        roc, maroc = mt.ROC(close)  # 变动率
-        mtm, mtmma = mt.MTM(close)  # 动量指标
-        dif_dma, difma_dma = mt.DMA(close)  # 平行线差指标
-
-        df['MACD'] = macd
-        df['DIF'] = dif
-        df['DEA'] = dea
-        df['K'] = k
-        df['D'] = d
-        df['J'] = j
-        df['BOLL_UP'] = upper
-        df['BOLL_MID'] = mid
-        df['BOLL_LOW'] = lower
-        df['RSI'] = rsi
-        df['PSY'] = psy
-        df['PSYMA'] = psyma
-        df['WR'] = wr
-        df['WR1'] = wr1
-        df['BIAS1'] = bias1
-        df['BIAS2'] = bias2
-        df['BIAS3'] = bias3
-        df['CCI'] = cci
-        df['MA5'] = ma5
-        df['MA10'] = ma10
-        df['MA20'] = ma20
-        df['MA60'] = ma60
-        df['ATR'] = atr
-        df['EMV'] = emv
-        df['MAEMV'] = maemv
-        df['DPO'] = dpo
-        df['MADPO'] = madpo
-        df['TRIX'] = trix
-        df['TRMA'] = trma
-        df['PDI'] = pdi
-        df['MDI'] = mdi
-        df['ADX'] = adx
-        df['ADXR'] = adxr
-        df['VR'] = vr
-        df['AR'] = ar
-        df['BR'] = br
-        df['ROC'] = roc
-        df['MAROC'] = maroc
-        df['MTM'] = mtm
-        df['MTMMA'] = mtmma
-        df['DIF_DMA'] = dif_dma
-        df['DIFMA_DMA'] = difma_dma
+        """
+        计算技术指标
+
+        结果按股票代码和K线指纹缓存，K线不变时图表、交易信号、AI分析和报告表格共用同一个DataFrame，
+        调用方不应原地修改它
 
+        Returns:
+            DataFrame: K线列 + 全部指标列
+        """
+        fingerprint, df = self._cached_indicators(code)
+        if df is not None:
+            return df
+        bars = self.data[code]
+        matrix = compute_indicator_matrix(bars['close'].values, bars['open'].values, bars['high'].values,
+                                          bars['low'].values, bars['volume'].values, dtype=self.precision)
+        df = indicator_frame(bars, matrix)
+        self._store_indicators(code, fingerprint, df)
         return df
 
+    def calculate_indicators_batch(self, codes=None):
+        """
+        批量计算多只股票的技术指标
+
+        K线数量相同的股票堆叠成 (股票数, K线数) 矩阵，每个指标沿时间轴一次算完。
+        每组股票的全部指标写入同一块 (指标数, 股票数, K线数) 的连续矩阵，各股票的指标列直接引用其中的切片
+
+        Args:
+            codes: 股票代码列表，默认为全部已获取数据的股票
+
+        Returns:
+            dict: {股票代码: 含技术指标的DataFrame}
+        """
+        codes = [code for code in (codes or self.stock_codes) if code in self.data]
+        results = {}
+        groups = {}
+        fingerprints = {}
+        for code in codes:
+            fingerprints[code], df = self._cached_indicators(code)
+            if df is not None:
+                results[code] = df
+            else:
+                groups.setdefault(len(self.data[code]), []).append(code)
+
+        for group in groups.values():
+            stacked = {col: np.vstack([self.data[code][col].values for code in group]).astype(self.precision)
+                       for col in ['close', 'open', 'high', 'low', 'volume']}
+            matrix = compute_indicator_matrix(stacked['close'], stacked['open'], stacked['high'],
+                                              stacked['low'], stacked['volume'], dtype=self.precision)
+            for i, code in enumerate(group):
+                results[code] = indicator_frame(self.data[code], matrix[:, i])
+                self._store_indicators(code, fingerprints[code], results[code])
+        return {code: results[code] for code in codes}
+
+    def screen_signals(self, codes=None):
+        """
+        选股：各股票最新一根K线上触发的信号，全部股票一次批量计算
+
+        Returns:
+            DataFrame: 行为股票代码，列为 Signals.NAMES
+        """
+        return Signals.screen(self.calculate_indicators_batch(codes))
+
     def plot_analysis(self, code):
         """绘制技术分析图表"""
+        return plot_indicators(self.calculate_indicators(code), self.get_stock_name(code), code)
 
-        def _style_axis(ax: Axes, title: str):
-            """统一设置坐标轴样式"""
-            ax.set_title(title, pad=12)
-            ax.spines['top'].set_visible(False)
-            ax.spines['right'].set_visible(False)
-            ax.spines['left'].set_color('#666666')
-            ax.spines['bottom'].set_color('#666666')
-            ax.tick_params(colors='#666666')
-            ax.grid(True, linestyle='--', alpha=0.3)
-            ax.legend(loc='upper left', frameon=True, facecolor='white',
-                      edgecolor='none', fontsize=10)
-            ax.set_facecolor('#F8F9FA')
-
-        stock_name = self.get_stock_name(code)
-        df = self.calculate_indicators(code)
-
-        font_path = './static/fonts/微软雅黑.ttf'
-        if not os.path.exists(font_path):
-            raise FileNotFoundError(f"找不到字体文件: {font_path}")
-
-        # 注册字体文件
-        custom_font = fm.FontProperties(fname=font_path)
-        fm.fontManager.addfont(font_path)
-
-        # 设置字体
-        plt.rcParams['font.sans-serif'] = [custom_font.get_name()]
-        plt.rcParams['axes.unicode_minus'] = False
-
-        # 设置全局样式
-        plt.rcParams.update({
-            'axes.facecolor': '#F8F9FA',
-            'axes.edgecolor': '#666666',
-            'grid.color': '#666666',
-            'grid.linestyle': '--',
-            'xtick.color': '#666666',
-            'ytick.color': '#666666',
-            'font.size': 10,
-            'axes.unicode_minus': False,
-            'axes.grid': True,
-            'grid.alpha': 0.3,
-            'axes.labelsize': 12,
-            'axes.titlesize': 14,
-            'figure.titlesize': 16,
-            'lines.linewidth': 1.5,
-            'lines.markersize': 6
-        })
-
-        # 创建图表
-        fig = plt.figure(figsize=(15, 32))
-        fig.patch.set_facecolor('#F0F2F6')
-
-        # 配色方案
-        colors = {
-            'primary': '#2E4053',
-            'ma5': '#E74C3C',
-            'ma10': '#3498DB',
-            'ma20': '#2ECC71',
-            'boll': ['#E74C3C', '#F4D03F', '#2ECC71'],
-            'volume': ['#E74C3C', '#2ECC71']
-        }
+    def generate_analysis_data(self, code, with_ai=True):
+        """
+        生成股票分析数据
 
-        # 主图：K线 + 均线 + BOLL
-        ax1 = plt.subplot2grid((12, 1), (0, 0), rowspan=2)
-        ax1.plot(df.index, df['close'], color=colors['primary'], label='收盘价', alpha=0.8, linewidth=2)
-        ax1.plot(df.index, df['MA5'], color=colors['ma5'], label='MA5', alpha=0.7)
-        ax1.plot(df.index, df['MA10'], color=colors['ma10'], label='MA10', alpha=0.7)
-        ax1.plot(df.index, df['MA20'], color=colors['ma20'], label='MA20', alpha=0.7)
-        ax1.plot(df.index, df['BOLL_UP'], color=colors['boll'][0], linestyle='--', label='BOLL上轨', alpha=0.7)
-        ax1.plot(df.index, df['BOLL_MID'], color=colors['boll'][1], linestyle='--', label='BOLL中轨', alpha=0.7)
-        ax1.plot(df.index, df['BOLL_LOW'], color=colors['boll'][2], linestyle='--', label='BOLL下轨', alpha=0.7)
-        _style_axis(ax1, f'{stock_name} ({code}) 技术指标')
-
-        # MACD
-        ax2 = plt.subplot2grid((12, 1), (2, 0))
-        ax2.plot(df.index, df['DIF'], color='#E74C3C', label='DIF(差离值)', alpha=0.8)
-        ax2.plot(df.index, df['DEA'], color='#2ECC71', label='DEA(讯号线)', alpha=0.8)
-        ax2.bar(df.index, df['MACD'], color=np.where(df['MACD'] > 0, '#E74C3C', '#2ECC71'),
-                label='MACD(指数平滑异同移动平均线)', alpha=0.6)
-        _style_axis(ax2, 'MACD (指数平滑异同移动平均线)')
-
-        # KDJ
-        ax3 = plt.subplot2grid((12, 1), (3, 0))
-        ax3.plot(df.index, df['K'], color='#E74C3C', label='K(随机指标K值)', alpha=0.8)
-        ax3.plot(df.index, df['D'], color='#2ECC71', label='D(随机指标D值)', alpha=0.8)
-        ax3.plot(df.index, df['J'], color='#3498DB', label='J(随机指标J值)', alpha=0.8)
-        _style_axis(ax3, 'KDJ(随机指标)')
-
-        # RSI
-        ax4 = plt.subplot2grid((12, 1), (4, 0))
-        ax4.plot(df.index, df['RSI'], color='#8E44AD', label='RSI(相对强弱指标)', alpha=0.8)
-        ax4.axhline(y=80, color='#E74C3C', linestyle='--', alpha=0.5)
-        ax4.axhline(y=20, color='#2ECC71', linestyle='--', alpha=0.5)
-        _style_axis(ax4, 'RSI (相对强弱指标)')
-
-        # BIAS
-        ax5 = plt.subplot2grid((12, 1), (5, 0))
-        ax5.plot(df.index, df['BIAS1'], color='#E74C3C', label='BIAS1', alpha=0.8)
-        ax5.plot(df.index, df['BIAS2'], color='#2ECC71', label='BIAS2', alpha=0.8)
-        ax5.plot(df.index, df['BIAS3'], color='#3498DB', label='BIAS3', alpha=0.8)
-        _style_axis(ax5, 'BIAS (乖离率)')
-
-        # DMI
-        ax6 = plt.subplot2grid((12, 1), (6, 0))
-        ax6.plot(df.index, df['PDI'], color='#E74C3C', label='PDI(上升方向线)', alpha=0.8)
-        ax6.plot(df.index, df['MDI'], color='#2ECC71', label='MDI(下降方向线)', alpha=0.8)
-        ax6.plot(df.index, df['ADX'], color='#3498DB', label='ADX(趋向指标)', alpha=0.8)
-        ax6.plot(df.index, df['ADXR'], color='#F4D03F', label='ADXR(平均方向指数)', alpha=0.8)
-        _style_axis(ax6, 'DMI(动向指标)')
-
-        # TRIX
-        ax7 = plt.subplot2grid((12, 1), (7, 0))
-        ax7.plot(df.index, df['TRIX'], color='#E74C3C', label='TRIX', alpha=0.8)
-        ax7.plot(df.index, df['TRMA'], color='#2ECC71', label='TRMA', alpha=0.8)
-        _style_axis(ax7, 'TRIX(三重指数平滑平均线)')
-
-        # ROC
-        ax8 = plt.subplot2grid((12, 1), (8, 0))
-        ax8.plot(df.index, df['ROC'], color='#E74C3C', label='ROC(变动率)', alpha=0.8)
-        ax8.plot(df.index, df['MAROC'], color='#2ECC71', label='MAROC(移动平均线)', alpha=0.8)
-        _style_axis(ax8, 'ROC(变动率)')
-
-        # VR和AR/BR
-        ax9 = plt.subplot2grid((12, 1), (9, 0))
-        ax9.plot(df.index, df['VR'], color='#E74C3C', label='VR(成交量比率)', alpha=0.8)
-        ax9.plot(df.index, df['AR'], color='#2ECC71', label='AR(人气指标)', alpha=0.8)
-        ax9.plot(df.index, df['BR'], color='#3498DB', label='BR(意愿指标)', alpha=0.8)
-        _style_axis(ax9, '成交量指标')
-
-        # MTM
-        ax10 = plt.subplot2grid((12, 1), (10, 0))
-        ax10.plot(df.index, df['MTM'], color='#E74C3C', label='MTM', alpha=0.8)
-        ax10.plot(df.index, df['MTMMA'], color='#2ECC71', label='MTMMA', alpha=0.8)
-        _style_axis(ax10, 'MTM(动量指标)')
-
-        # DMA
-        ax11 = plt.subplot2grid((12, 1), (11, 0))
-        ax11.plot(df.index, df['DIF_DMA'], color='#E74C3C', label='DIF_DMA', alpha=0.8)
-        ax11.plot(df.index, df['DIFMA_DMA'], color='#2ECC71', label='DIFMA_DMA', alpha=0.8)
-        _style_axis(ax11, 'DMA(平行线差指标)')
-
-        # 调整子图间距
-        plt.subplots_adjust(hspace=0.4)
-
-        return plot_to_base64(fig)
-
-    def generate_analysis_data(self, code):
-        """生成股票分析数据"""
+        Args:
+            with_ai: 是否同时请求AI分析；报告流水线单独并发请求AI分析，会传入 False
+        """
         df = self.data[code]
         latest_df = self.calculate_indicators(code)
 
@@ -431,17 +495,26 @@ class StockAnalyzer:
         }
 
         """添加AI分析结果"""
-        # 获取原有的分析数据
-        if self.deepseek:
-            try:
-                api_result = self.deepseek.request_analysis(df, latest_df)
-                if api_result:
-                    analysis_data.update(api_result)
-            except Exception as e:
-                print(f"AI分析过程出错: {str(e)}")
+        if with_ai:
+            analysis_data.update(self.request_ai_analysis(code))
 
         return analysis_data
 
+    def request_ai_analysis(self, code):
+        """
+        请求AI分析
+
+        Returns:
+            dict: AI分析结果，未配置API或请求出错时为空字典
+        """
+        if not self.deepseek:
+            return {}
+        try:
+            return self.deepseek.request_analysis(self.data[code], self.calculate_indicators(code)) or {}
+        except Exception as e:
+            print(f"AI分析过程出错: {str(e)}")
+            return {}
+
     def _generate_ai_analysis_html(self, ai_analysis):
         """生成AI分析结果的HTML代码"""
         html = """
@@ -480,8 +553,222 @@ class StockAnalyzer:
         else:
             return str(content)
 
-    def generate_html_report(self):
-        """生成HTML格式的分析报告"""
+    async def _iter_stocks(self, codes, chart_workers=None, llm_workers=None, chart_mode='png',
+                           chart_dir='public/charts', chart_url='/public/charts'):
+        """
+        按流水线生成各股票的报告片段
+
+        每只股票的图表在进程池中渲染，同时在有界的异步池中请求AI分析，两者互不等待；
+        chart_mode 为 'file' 时图表写入 chart_dir 下按内容哈希命名的文件，文件已存在时直接引用不再渲染，
+        全部完成后清理 chart_dir 中长期没有被引用的文件（见 Charts.prune）；
+        为 'client' 时不渲染图表，只把指标数据编码进片段
+
+        Yields:
+            str: 按 codes 的顺序产出HTML片段，前面的股票一完成就产出，不等后面的股票
+        """
+        chart_workers = _worker_count(chart_workers, 'CHART_WORKERS', min(len(codes), os.cpu_count() or 1))
+        llm_workers = _worker_count(llm_workers, 'LLM_WORKERS', 4)
+        semaphore = asyncio.Semaphore(max(llm_workers, 1))
+        loop = asyncio.get_running_loop()
+        # 图表模板不是线程安全的，不用进程池时在单个后台线程里依次渲染；浏览器端绘图时不需要渲染
+        if chart_mode == 'client':
+            chart_workers = 0
+        elif chart_mode == 'file':
+            os.makedirs(chart_dir, exist_ok=True)
+        executor = _chart_pool(chart_workers) if chart_workers > 1 else ThreadPoolExecutor(1)
+        used = []
+
+        async def render(code):
+            df = self.calculate_indicators(code)
+            stock_name = self.get_stock_name(code)
+            chart = None
+            if chart_mode == 'png':
+                chart = loop.run_in_executor(executor, plot_indicators, df, stock_name, code)
+            elif chart_mode == 'file':
+                filename = f'{Charts.chart_key(df, stock_name, code)}.png'
+                path = os.path.join(chart_dir, filename)
+                used.append(filename)
+                try:
+                    # 复用已有文件时更新修改时间，清理时按最近一次引用计算保留期
+                    os.utime(path)
+                except FileNotFoundError:
+                    chart = loop.run_in_executor(executor, Charts.write_png, path, df, stock_name, code)
+            try:
+                analysis_data = self.generate_analysis_data(code, with_ai=False)
+                if self.deepseek:
+                    async with semaphore:
+                        analysis_data.update(await asyncio.to_thread(self.request_ai_analysis, code))
+                if chart_mode == 'png':
+                    chart_html = _image_chart_html(stock_name, code, f'data:image/png;base64,{await chart}')
+                elif chart_mode == 'file':
+                    if chart is not None:
+                        await chart
+                    chart_html = _image_chart_html(stock_name, code, f'{chart_url}/{filename}')
+                else:
+                    chart_html = _client_chart_html(stock_name, code, Charts.chart_payload(df, stock_name, code))
+            except BaseException:
+                # 分析出错或被取消时不再需要图表：取消还没开始的渲染，已经结束的取走结果，不留下未读取的异常
+                if chart is not None and not chart.cancel() and not chart.cancelled():
+                    chart.exception()
+                raise
+            return self._render_stock_html(code, analysis_data, chart_html)
+
+        tasks = deque(asyncio.ensure_future(render(code)) for code in codes)
+        try:
+            while tasks:
+                # 产出后不再持有该片段，内存只与尚未按顺序产出的片段数有关
+                yield await tasks.popleft()
+            if chart_mode == 'file':
+                # 全部股票完成后清理保留期外、本次没有引用的图表文件；中途失败时不清理
+                Charts.prune(chart_dir, used)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # 进程池在多次运行之间复用，只关闭本次创建的线程
+            if isinstance(executor, ThreadPoolExecutor):
+                executor.shutdown()
+
+    async def _produce_stocks(self, chunks, stop, codes, *args):
+        """
+        运行 _iter_stocks，把片段依次放入有界队列 chunks：('chunk', 片段)，结束时放入 ('done', None)，
+        出错时放入 ('error', 异常)；队列满时等待消费方取走，stop 置位后不再放入
+        """
+        async def put(item):
+            while not stop.is_set():
+                try:
+                    chunks.put_nowait(item)
+                    return
+                except queue.Full:
+                    await asyncio.sleep(0.05)
+
+        stocks = self._iter_stocks(codes, *args)
+        try:
+            async for content in stocks:
+                await put(('chunk', content))
+                if stop.is_set():
+                    return
+            await put(('done', None))
+        except Exception as e:
+            await put(('error', e))
+        finally:
+            await stocks.aclose()
+
+    def _render_stock_html(self, code, analysis_data, chart_html):
+        """生成单只股票的报告HTML片段"""
+        stock_name = self.get_stock_name(code)
+
+        # 生成基础数据部分的HTML
+        basic_data_html = f"""
+        <div class="indicator-section">
+            <h3>基础数据</h3>
+            <table class="data-table">
+                <tr>
+                    <th>指标</th>
+                    <th>数值</th>
+                </tr>
+                {''.join(_generate_table_row(k, v) for k, v in analysis_data['基础数据'].items())}
+            </table>
+        </div>
+        """
+
+        # 生成技术指标部分的HTML
+        indicator_sections = []
+        for section_name, indicators in analysis_data['技术指标'].items():
+            indicator_html = f"""
+            <div class="indicator-section">
+                <h3>{section_name}</h3>
+                <table class="data-table">
+                    <tr>
+                        <th>指标</th>
+                        <th>数值</th>
+                    </tr>
+                    {''.join(_generate_table_row(k, v) for k, v in indicators.items())}
+                </table>
+            </div>
+            """
+            indicator_sections.append(indicator_html)
+
+        # 生成交易信号部分的HTML
+        signals_html = f"""
+        <div class="indicator-section">
+            <h3>交易信号</h3>
+            <ul class="signal-list">
+                {''.join(f'<li>{signal}</li>' for signal in analysis_data['技术分析建议'])}
+            </ul>
+        </div>
+        """
+
+        # 生成AI分析结果的HTML
+        ai_analysis_html = ""
+        if "AI分析结果" in analysis_data:
+            sections = analysis_data["AI分析结果"]
+            for section_name, content in sections.items():
+                if section_name != "分析状态":
+                    ai_analysis_html += f"""
+                    <div class="indicator-section">
+                        <h3>{section_name}</h3>
+                        <div class="analysis-content">
+                            {content}
+                        </div>
+                    </div>
+                    """
+
+        # 组合单个股票的完整内容
+        return f"""
+        <div class="stock-container">
+            <h2>{stock_name} ({code}) 分析报告</h2>
+            
+            <div class="section-divider">
+                <h2>基础技术分析</h2>
+            </div>
+            
+            <div class="data-grid">
+                {basic_data_html}
+                {signals_html}
+            </div>
+            
+            <div class="section-divider">
+                <h2>技术指标详情</h2>
+            </div>
+            
+            {''.join(indicator_sections)}
+            
+            <div class="section-divider">
+                <h2>技术指标图表</h2>
+            </div>
+            
+            <div class="chart-container">
+                {chart_html}
+            </div>
+            
+            <div class="section-divider">
+                <h2>人工智能分析报告</h2>
+            </div>
+            {ai_analysis_html}
+        </div>
+        """
+
+    def iter_html_report(self, chart_workers=None, llm_workers=None, chart_mode=None,
+                         chart_dir='public/charts', chart_url='/public/charts'):
+        """
+        逐段生成HTML格式的分析报告：先产出模板中 $content 之前的部分，然后每只股票的片段按顺序一生成好就产出，
+        最后产出模板的剩余部分；拼接起来与一次性生成的报告完全相同
+
+        Args:
+            chart_workers: 图表渲染进程数，默认读取环境变量 CHART_WORKERS，再默认为股票数和CPU核数的较小值；
+                           不大于1时在当前进程的后台线程中渲染
+            llm_workers: 同时进行的AI分析请求数，默认读取环境变量 LLM_WORKERS，再默认为4
+            chart_mode: 图表模式 'png'、'file' 或 'client'，默认读取环境变量 CHART_MODE，都没有时为 'png'
+            chart_dir: 'file' 模式下图表文件的写入目录
+            chart_url: 'file' 模式下报告引用图表文件的地址前缀，默认为 server.py 提供 public/charts 的地址；
+                       报告会在别的路径下展示（如流式接口）时不能用相对地址
+
+        Yields:
+            str: 报告片段
+        """
+        chart_mode = _chart_mode(chart_mode)
+
         # 读取模板文件
         with open('static/templates/report_template.html', 'r', encoding='utf-8') as f:
             html_template = f.read()
@@ -493,130 +780,111 @@ class StockAnalyzer:
         tz = pytz.timezone('Asia/Shanghai')
         current_time = datetime.now(tz).strftime('%Y年%m月%d日 %H时%M分%S秒')
 
-        stock_contents = []
-        for code in self.stock_codes:
-            if code in self.data:
-                analysis_data = self.generate_analysis_data(code)
-                chart_base64 = self.plot_analysis(code)
-                stock_name = self.get_stock_name(code)
-
-                # 生成基础数据部分的HTML
-                basic_data_html = f"""
-                <div class="indicator-section">
-                    <h3>基础数据</h3>
-                    <table class="data-table">
-                        <tr>
-                            <th>指标</th>
-                            <th>数值</th>
-                        </tr>
-                        {''.join(_generate_table_row(k, v) for k, v in analysis_data['基础数据'].items())}
-                    </table>
-                </div>
-                """
+        # 在 $content 处把模板分成头尾两段，分别插入CSS样式等内容
+        head, tail = html_template.split('$content', 1)
+        values = dict(styles=css_content, generate_time=current_time,
+                      scripts=_client_chart_scripts() if chart_mode == 'client' else '')
+
+        # 一次批量算完全部股票的指标并写入缓存，之后图表和分析数据直接取缓存
+        self.calculate_indicators_batch()
+        codes = [code for code in self.stock_codes if code in self.data]
+
+        yield Template(head).substitute(values)
+
+        # 流水线在后台线程的事件循环里运行，片段按顺序放进有界队列：消费方处理片段期间图表渲染和AI请求照常推进，
+        # 只有队列满（消费方落后太多）时才暂停；消费方提前结束时取消后台任务
+        chunks = queue.Queue(maxsize=REPORT_QUEUE_SIZE)
+        stop = threading.Event()
+        loop = asyncio.new_event_loop()
+        task = loop.create_task(self._produce_stocks(
+            chunks, stop, codes, chart_workers, llm_workers, chart_mode, chart_dir, chart_url))
+        producer = threading.Thread(target=_run_loop, args=(loop, task), daemon=True)
+        producer.start()
+        try:
+            first = True
+            while True:
+                kind, content = chunks.get()
+                if kind == 'done':
+                    break
+                if kind == 'error':
+                    raise content
+                yield content if first else '\n' + content
+                first = False
+        finally:
+            stop.set()
+            loop.call_soon_threadsafe(task.cancel)
+            producer.join()
+            loop.close()
+
+        yield Template(tail).substitute(values)
+
+    def generate_html_report(self, chart_workers=None, llm_workers=None, chart_mode=None,
+                             chart_dir='public/charts', chart_url='/public/charts'):
+        """
+        生成HTML格式的分析报告，参数见 iter_html_report
 
-                # 生成技术指标部分的HTML
-                indicator_sections = []
-                for section_name, indicators in analysis_data['技术指标'].items():
-                    indicator_html = f"""
-                    <div class="indicator-section">
-                        <h3>{section_name}</h3>
-                        <table class="data-table">
-                            <tr>
-                                <th>指标</th>
-                                <th>数值</th>
-                            </tr>
-                            {''.join(_generate_table_row(k, v) for k, v in indicators.items())}
-                        </table>
-                    </div>
-                    """
-                    indicator_sections.append(indicator_html)
-
-                # 生成交易信号部分的HTML
-                signals_html = f"""
-                <div class="indicator-section">
-                    <h3>交易信号</h3>
-                    <ul class="signal-list">
-                        {''.join(f'<li>{signal}</li>' for signal in analysis_data['技术分析建议'])}
-                    </ul>
-                </div>
-                """
-
-                # 生成AI分析结果的HTML
-                ai_analysis_html = ""
-                if "AI分析结果" in analysis_data:
-                    sections = analysis_data["AI分析结果"]
-                    for section_name, content in sections.items():
-                        if section_name != "分析状态":
-                            ai_analysis_html += f"""
-                            <div class="indicator-section">
-                                <h3>{section_name}</h3>
-                                <div class="analysis-content">
-                                    {content}
-                                </div>
-                            </div>
-                            """
-
-                # 组合单个股票的完整内容
-                stock_content = f"""
-                <div class="stock-container">
-                    <h2>{stock_name} ({code}) 分析报告</h2>
-                    
-                    <div class="section-divider">
-                        <h2>基础技术分析</h2>
-                    </div>
-                    
-                    <div class="data-grid">
-                        {basic_data_html}
-                        {signals_html}
-                    </div>
-                    
-                    <div class="section-divider">
-                        <h2>技术指标详情</h2>
-                    </div>
-                    
-                    {''.join(indicator_sections)}
-                    
-                    <div class="section-divider">
-                        <h2>技术指标图表</h2>
-                    </div>
-                    
-                    <div class="chart-container">
-                        <img src="data:image/png;base64,{chart_base64}" 
-                             alt="{stock_name} ({code})技术分析图表"
-                             loading="lazy">
-                    </div>
-            
-                    <div class="section-divider">
-                        <h2>人工智能分析报告</h2>
-                    </div>
-                    {ai_analysis_html}
-                </div>
-                """
-                stock_contents.append(stock_content)
-
-        # 将CSS样式和内容插入到模板中
-        template = Template(html_template)
-        html_content = template.substitute(
-            styles=css_content,
-            generate_time=current_time,
-            content='\n'.join(stock_contents)
-        )
-        return html_content
-
-    def run_analysis(self, output_path='public/index.html'):
-        """运行分析并生成报告"""
+        Returns:
+            str: 完整的报告HTML
+        """
+        return ''.join(self.iter_html_report(chart_workers, llm_workers, chart_mode, chart_dir, chart_url))
+
+    def stream_analysis(self, output_path='public/index.html', chart_workers=None, llm_workers=None,
+                        chart_mode=None, chart_url=None):
+        """
+        运行分析并逐段产出报告，同时写入 output_path
+
+        报告先逐段写入临时文件，全部完成后再原子替换 output_path，中途失败或被中断时保留原来的报告
+
+        Args:
+            output_path: 报告输出路径，为None时只产出不写文件
+            chart_workers: 图表渲染进程数，见 iter_html_report
+            llm_workers: 同时进行的AI分析请求数，见 iter_html_report
+            chart_mode: 图表模式，见 iter_html_report；'file' 模式的图表写入报告所在目录下的 charts 目录
+            chart_url: 'file' 模式下报告引用图表文件的地址前缀，默认为相对报告文件的 charts；
+                       片段同时在其他地址展示时（如 server.py 的流式接口）需要传入绝对地址
+
+        Yields:
+            str: 报告片段
+        """
         self.fetch_data()
-        html_report = self.generate_html_report()
+
+        output_dir = os.path.dirname(output_path or 'public/index.html')
+        # 'file' 模式的图表文件写在报告旁边的 charts 目录
+        chunks = self.iter_html_report(chart_workers, llm_workers, chart_mode,
+                                       os.path.join(output_dir, 'charts'), chart_url or 'charts')
+        if output_path is None:
+            yield from chunks
+            return
 
         # 创建输出目录
-        output_dir = os.path.dirname(output_path)
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        # 写入HTML报告
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_report)
+        # 临时文件名带上线程号：服务端在多个线程里同时处理流式请求，不能共用一个临时文件
+        tmp = f'{output_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    f.flush()
+                    yield chunk
+            os.replace(tmp, output_path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def run_analysis(self, output_path='public/index.html', chart_workers=None, llm_workers=None, chart_mode=None):
+        """
+        运行分析并生成报告，报告逐段写入文件，不在内存中拼接整份报告
 
+        Args:
+            output_path: 报告输出路径
+            chart_workers: 图表渲染进程数，见 iter_html_report
+            llm_workers: 同时进行的AI分析请求数，见 iter_html_report
+            chart_mode: 图表模式，见 stream_analysis
+        """
+        for _ in self.stream_analysis(output_path, chart_workers, llm_workers, chart_mode):
+            pass
         return output_path
 
 
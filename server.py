@@ -1,5 +1,6 @@
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 import os
+from html import escape
 import logging
 from logging.handlers import RotatingFileHandler
 from dotenv import load_dotenv
@@ -53,6 +54,9 @@ config2 = os.getenv('CONFIG2')
 app.logger.info(f"Config1: {config1}")
 app.logger.info(f"Config2: {config2}")
 
+# 按内容哈希命名的图表文件的缓存时间（秒）
+CHART_MAX_AGE = 365 * 24 * 3600
+
 @app.route('/')
 def index():
     app.logger.info("访问首页")
@@ -153,10 +157,41 @@ def analyze_stocks():
             "message": str(e)
         }), 500
 
+@app.route('/analyze_stocks/stream', methods=['GET', 'POST'])
+def analyze_stocks_stream():
+    # POST 传入要分析的股票，GET 分析 .env 中配置的全部股票；报告逐段返回，同时写入 public/index.html
+    if request.method == 'POST':
+        selected_stocks = request.json
+    else:
+        selected_stocks = {k.replace('STOCK_', ''): v for k, v in os.environ.items() if k.startswith('STOCK_')}
+    app.logger.info(f"开始流式分析股票: {selected_stocks}")
+    analyzer = StockAnalyzer(selected_stocks)
+
+    def generate():
+        try:
+            # 报告在 /analyze_stocks/stream 下展示，图表文件要用绝对地址引用
+            yield from analyzer.stream_analysis(chart_url='/public/charts')
+            app.logger.info("流式分析完成")
+        except Exception as e:
+            # 响应头已经发出，只能把错误信息写进页面
+            app.logger.error(f"流式分析失败: {str(e)}")
+            yield f'<p class="error">股票分析失败: {escape(str(e))}</p>'
+
+    response = Response(stream_with_context(generate()), mimetype='text/html')
+    response.headers['X-Accel-Buffering'] = 'no'  # 关闭反向代理的缓冲，逐段送达浏览器
+    return response
+
+@app.route('/public/charts/<filename>')
+def serve_chart(filename):
+    # 图表文件按内容哈希命名，内容不会变化，允许浏览器和代理长期缓存
+    response = send_from_directory('public/charts', filename, max_age=CHART_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={CHART_MAX_AGE}, immutable'
+    return response
+
 @app.route('/public/<path:filename>')
 def serve_report(filename):
     app.logger.info(f"访问报告文件: {filename}")
-    return send_file(f'public/{filename}')
+    return send_from_directory('public', filename)
 
 if __name__ == '__main__':
     app.logger.info("应用启动")
@@ -0,0 +1,180 @@
+// 浏览器端技术指标图表：解码 Charts.chart_payload 生成的差分数据，按 CHART_PANELS 在 canvas 上绘制
+(function () {
+    const ROW_HEIGHT = 240;      // 每行面板的高度（CSS像素）
+    const PAD = {left: 64, right: 16, top: 34, bottom: 26};
+    const BACKGROUND = '#F0F2F6', AXES = '#F8F9FA', GRID = 'rgba(102,102,102,0.3)', TEXT = '#666666';
+    const UP = '#E74C3C', DOWN = '#2ECC71';
+
+    function decode(payload) {
+        const scale = payload.scale, columns = {};
+        for (const [name, deltas] of Object.entries(payload.columns)) {
+            let acc = 0;
+            columns[name] = deltas.map(d => d === null ? NaN : (acc += d) / scale);
+        }
+        let time = null;
+        if (payload.time) {
+            let t = payload.time.start;
+            time = [t].concat(payload.time.delta.map(d => (t += d * payload.time.unit)));
+        }
+        return {columns, time, unit: payload.time ? payload.time.unit : 0};
+    }
+
+    function pad2(v) {
+        return String(v).padStart(2, '0');
+    }
+
+    function timeLabel(seconds, unit) {
+        const d = new Date(seconds * 1000);  // K线时间没有时区，按UTC读取
+        if (unit < 86400) return `${pad2(d.getUTCMonth() + 1)}-${pad2(d.getUTCDate())} ${pad2(d.getUTCHours())}:${pad2(d.getUTCMinutes())}`;
+        return `${d.getUTCFullYear()}-${pad2(d.getUTCMonth() + 1)}-${pad2(d.getUTCDate())}`;
+    }
+
+    function niceTicks(lo, hi, count) {
+        const raw = (hi - lo) / count, mag = Math.pow(10, Math.floor(Math.log10(raw)));
+        const step = [1, 2, 2.5, 5, 10].map(m => m * mag).find(s => s >= raw);
+        const ticks = [];
+        for (let v = Math.ceil(lo / step) * step; v <= hi + step * 1e-9; v += step) ticks.push(+v.toFixed(10));
+        return ticks;
+    }
+
+    function drawPanel(ctx, panel, data, box, n, title) {
+        const x = i => box.x + (i + 0.5) * box.w / n;
+        const values = panel.lines.map(line => data.columns[line[0]]);
+        if (panel.bar) values.push(data.columns[panel.bar[0]]);
+        let lo = Infinity, hi = -Infinity;
+        for (const series of values) for (const v of series) if (isFinite(v)) { lo = Math.min(lo, v); hi = Math.max(hi, v); }
+        if (panel.bar) { lo = Math.min(lo, 0); hi = Math.max(hi, 0); }
+        for (const [v] of panel.hlines) { lo = Math.min(lo, v); hi = Math.max(hi, v); }
+        if (!isFinite(lo)) { lo = 0; hi = 1; }
+        if (hi === lo) { lo -= 1; hi += 1; }
+        const margin = (hi - lo) * 0.05;
+        lo -= margin; hi += margin;
+        const y = v => box.y + box.h - (v - lo) / (hi - lo) * box.h;
+
+        ctx.fillStyle = AXES;
+        ctx.fillRect(box.x, box.y, box.w, box.h);
+        ctx.fillStyle = '#000';
+        ctx.font = '14px sans-serif';
+        ctx.textAlign = 'center';
+        ctx.fillText(title, box.x + box.w / 2, box.y - 12);
+
+        // 网格和刻度
+        ctx.font = '10px sans-serif';
+        ctx.lineWidth = 1;
+        ctx.strokeStyle = GRID;
+        ctx.fillStyle = TEXT;
+        ctx.setLineDash([4, 3]);
+        ctx.textAlign = 'right';
+        for (const v of niceTicks(lo, hi, 5)) {
+            ctx.beginPath(); ctx.moveTo(box.x, y(v)); ctx.lineTo(box.x + box.w, y(v)); ctx.stroke();
+            ctx.fillText(String(v), box.x - 6, y(v) + 3);
+        }
+        ctx.textAlign = 'center';
+        const every = Math.max(1, Math.ceil(n / Math.max(1, Math.floor(box.w / 110))));
+        for (let i = 0; i < n; i += every) {
+            ctx.beginPath(); ctx.moveTo(x(i), box.y); ctx.lineTo(x(i), box.y + box.h); ctx.stroke();
+            ctx.fillText(data.time ? timeLabel(data.time[i], data.unit) : String(i), x(i), box.y + box.h + 14);
+        }
+        ctx.setLineDash([]);
+        ctx.strokeStyle = TEXT;
+        ctx.beginPath(); ctx.moveTo(box.x, box.y); ctx.lineTo(box.x, box.y + box.h); ctx.lineTo(box.x + box.w, box.y + box.h); ctx.stroke();
+
+        if (panel.bar) {
+            const series = data.columns[panel.bar[0]], width = box.w / n * 0.8;
+            ctx.globalAlpha = 0.6;
+            series.forEach((v, i) => {
+                if (!isFinite(v)) return;
+                ctx.fillStyle = v > 0 ? UP : DOWN;
+                ctx.fillRect(x(i) - width / 2, Math.min(y(v), y(0)), width, Math.abs(y(v) - y(0)));
+            });
+        }
+        for (const [v, color] of panel.hlines) {
+            ctx.globalAlpha = 0.5;
+            ctx.strokeStyle = color;
+            ctx.setLineDash([6, 4]);
+            ctx.beginPath(); ctx.moveTo(box.x, y(v)); ctx.lineTo(box.x + box.w, y(v)); ctx.stroke();
+        }
+        for (const [col, color, , dashed, alpha, width] of panel.lines) {
+            ctx.globalAlpha = alpha;
+            ctx.strokeStyle = color;
+            ctx.lineWidth = width;
+            ctx.setLineDash(dashed ? [6, 4] : []);
+            ctx.beginPath();
+            let pen = false;
+            data.columns[col].forEach((v, i) => {
+                if (!isFinite(v)) { pen = false; return; }
+                pen ? ctx.lineTo(x(i), y(v)) : ctx.moveTo(x(i), y(v));
+                pen = true;
+            });
+            ctx.stroke();
+        }
+        ctx.globalAlpha = 1;
+        ctx.setLineDash([]);
+
+        // 图例
+        const entries = panel.lines.map(l => [l[2], l[1], l[3]]);
+        if (panel.bar) entries.push([panel.bar[1], data.columns[panel.bar[0]][0] > 0 ? UP : DOWN, null]);  // 与PNG图表一致，取第一根柱子的颜色
+        ctx.font = '10px sans-serif';
+        ctx.textAlign = 'left';
+        const legendWidth = Math.max(...entries.map(e => ctx.measureText(e[0]).width)) + 40;
+        ctx.fillStyle = 'rgba(255,255,255,0.8)';
+        ctx.fillRect(box.x + 8, box.y + 8, legendWidth, entries.length * 15 + 8);
+        entries.forEach(([label, color, dashed], k) => {
+            const ly = box.y + 20 + k * 15;
+            ctx.strokeStyle = ctx.fillStyle = color;
+            if (dashed === null) {
+                ctx.fillRect(box.x + 14, ly - 5, 20, 8);
+            } else {
+                ctx.lineWidth = 1.5;
+                ctx.setLineDash(dashed ? [4, 3] : []);
+                ctx.beginPath(); ctx.moveTo(box.x + 14, ly); ctx.lineTo(box.x + 34, ly); ctx.stroke();
+                ctx.setLineDash([]);
+            }
+            ctx.fillStyle = '#333';
+            ctx.fillText(label, box.x + 40, ly + 4);
+        });
+    }
+
+    function draw(canvas, payload, data) {
+        const panels = payload.panels.map(name => CHART_PANELS.find(p => p.name === name));
+        const rows = panels.reduce((s, p) => s + p.rows, 0);
+        const width = canvas.parentElement.clientWidth || 1200, height = rows * ROW_HEIGHT;
+        const ratio = window.devicePixelRatio || 1;
+        canvas.width = width * ratio;
+        canvas.height = height * ratio;
+        canvas.style.width = width + 'px';
+        canvas.style.height = height + 'px';
+        const ctx = canvas.getContext('2d');
+        ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+        ctx.fillStyle = BACKGROUND;
+        ctx.fillRect(0, 0, width, height);
+
+        const n = Object.values(data.columns)[0].length;
+        let top = 0;
+        for (const panel of panels) {
+            const h = panel.rows * ROW_HEIGHT;
+            const box = {x: PAD.left, y: top + PAD.top, w: width - PAD.left - PAD.right, h: h - PAD.top - PAD.bottom};
+            const title = panel.title.replace('{stock_name}', payload.name).replace('{code}', payload.code);
+            drawPanel(ctx, panel, data, box, n, title);
+            top += h;
+        }
+    }
+
+    function drawAll() {
+        for (const node of document.querySelectorAll('script.chart-data')) {
+            const canvas = node.previousElementSibling;
+            if (!node.decoded) {
+                node.payload = JSON.parse(node.textContent);
+                node.decoded = decode(node.payload);
+            }
+            draw(canvas, node.payload, node.decoded);
+        }
+    }
+
+    let pending = null;
+    window.addEventListener('resize', () => {
+        clearTimeout(pending);
+        pending = setTimeout(drawAll, 200);
+    });
+    document.addEventListener('DOMContentLoaded', drawAll);
+})();
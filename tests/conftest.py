@@ -0,0 +1,31 @@
+import os
+import sys
+
+import matplotlib
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import Charts
+
+DEFAULT_FONT_PATH = Charts.FONT_PATH
+
+
+def make_bars(n, seed=0):
+    """随机游走的日K线"""
+    rng = np.random.default_rng(seed)
+    close = 10 + np.cumsum(rng.normal(0, 0.1, n))
+    return pd.DataFrame({'open': close, 'close': close + 0.01, 'high': close + 0.2, 'low': close - 0.2,
+                         'volume': rng.random(n) * 1e6},
+                        index=pd.date_range('2024-01-01', periods=n, name='day'))
+
+
+@pytest.fixture(autouse=True)
+def no_external_services(monkeypatch):
+    """不请求AI；没有报告字体时用 matplotlib 自带的字体渲染图表"""
+    monkeypatch.delenv('DEEPSEEK_API_KEY', raising=False)
+    if not os.path.exists(os.path.join(ROOT, DEFAULT_FONT_PATH)):
+        monkeypatch.setattr(Charts, 'FONT_PATH', os.path.join(matplotlib.get_data_path(), 'fonts/ttf/DejaVuSans.ttf'))
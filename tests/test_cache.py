@@ -0,0 +1,36 @@
+import os
+import threading
+
+import pandas as pd
+
+import main
+from conftest import make_bars
+
+
+def test_concurrent_store_same_fingerprint(tmp_path, monkeypatch):
+    # 多个线程同时缓存同一只股票的同一份数据：各写各的临时文件，最后留下一份完整的缓存
+    analyzer = main.StockAnalyzer({'甲': 'sh600000'}, cache_dir=str(tmp_path))
+    analyzer.data['sh600000'] = make_bars(120)
+    fingerprint, _ = analyzer._cached_indicators('sh600000')
+    df = analyzer.calculate_indicators('sh600000')
+
+    barrier = threading.Barrier(4)
+    paths = []
+    to_pickle = pd.DataFrame.to_pickle
+
+    def write_then_wait(self, path, *args, **kwargs):
+        to_pickle(self, path, *args, **kwargs)
+        paths.append(path)
+        barrier.wait(timeout=30)
+
+    monkeypatch.setattr(pd.DataFrame, 'to_pickle', write_then_wait)
+    threads = [threading.Thread(target=analyzer._store_indicators, args=('sh600000', fingerprint, df))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(paths)) == 4
+    assert os.listdir(tmp_path) == [os.path.basename(analyzer._cache_path('sh600000', fingerprint))]
+    pd.testing.assert_frame_equal(pd.read_pickle(analyzer._cache_path('sh600000', fingerprint)), df)
@@ -0,0 +1,43 @@
+import numpy as np
+
+from AshareCalendar import TradingCalendar, get_calendar
+
+
+def test_holidays_are_not_sessions():
+    calendar = get_calendar()
+    assert calendar.is_session('2024-09-30')
+    assert not calendar.is_session('2024-10-01')
+    assert not calendar.is_session('2024-10-07')
+    assert not calendar.is_session('2024-10-12')  # 周六
+    assert calendar.is_session('2024-10-08')
+
+
+def test_count_and_offset():
+    calendar = get_calendar()
+    # 2024年沪深交易所共242个交易日
+    assert calendar.count('2023-12-31', '2024-12-31') == 242
+    # (start, end] 区间：国庆长假前一天到节后第一天只有一个交易日
+    assert calendar.count('2024-09-30', '2024-10-08') == 1
+    assert calendar.offset('2024-09-30', 1) == np.datetime64('2024-10-08')
+    # 非交易日从前一个交易日起算
+    assert calendar.offset('2024-10-05', 0) == np.datetime64('2024-09-30')
+    assert calendar.offset('2024-10-05', -1) == np.datetime64('2024-09-27')
+
+
+def test_periods_by_frequency():
+    calendar = get_calendar()
+    assert calendar.periods('2024-09-27', '2024-10-31') == 19
+    assert calendar.periods('2024-09-27', '2024-10-31', '1w') == 5
+    assert calendar.periods('2024-09-27', '2024-10-31', '1M') == 2
+
+
+def test_missing_and_learn():
+    calendar = TradingCalendar.default('2024-01-01', '2024-12-31')
+    times = np.array(['2024-09-27', '2024-10-09'], dtype='datetime64[D]')
+    np.testing.assert_array_equal(calendar.missing(times),
+                                  np.array(['2024-09-30', '2024-10-08'], dtype='datetime64[D]'))
+    # 用实际K线日期校正：区间内以K线日期为准，区间外不变
+    calendar.learn(np.array(['2024-09-27', '2024-10-08', '2024-10-09'], dtype='datetime64[D]'))
+    assert not calendar.is_session('2024-09-30')
+    assert calendar.is_session('2024-10-10')
+    assert calendar.count('2024-09-26', '2024-10-09') == 3
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+import main
+from conftest import make_bars
+
+
+def bar_matrix(frames):
+    return [np.vstack([df[col].values for df in frames]) for col in ['close', 'open', 'high', 'low', 'volume']]
+
+
+def test_indicator_frame_references_matrix():
+    bars = make_bars(120)
+    for dtype in (None, 'float32'):
+        matrix = main.compute_indicator_matrix(bars['close'].values, bars['open'].values, bars['high'].values,
+                                               bars['low'].values, bars['volume'].values, dtype=dtype)
+        df = main.indicator_frame(bars, matrix)
+        assert list(df.columns) == list(bars.columns) + main.INDICATOR_PLAN.names
+        for k, name in enumerate(main.INDICATOR_PLAN.names):
+            assert np.shares_memory(df[name].values, matrix[k])
+        expected = pd.concat([bars, pd.DataFrame(matrix.T, index=bars.index, columns=main.INDICATOR_PLAN.names)],
+                             axis=1)
+        pd.testing.assert_frame_equal(df, expected)
+
+
+def test_batch_frames_reference_shared_matrix():
+    frames = [make_bars(120, seed) for seed in range(3)]
+    matrix = main.compute_indicator_matrix(*bar_matrix(frames))
+    for i, bars in enumerate(frames):
+        df = main.indicator_frame(bars, matrix[:, i])
+        assert np.shares_memory(df['MACD'].values, matrix)
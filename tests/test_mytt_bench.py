@@ -0,0 +1,30 @@
+import os
+
+import MyTTBench
+from conftest import ROOT
+
+
+def failed(res):
+    return {name: r for name, r in res.items() if r['ok'] is False}
+
+
+def test_golden_values():
+    res = MyTTBench.check_golden(os.path.join(ROOT, MyTTBench.GOLDEN))
+    assert res and not failed(res)
+
+
+def test_event_functions_match_reference():
+    res = MyTTBench.check_events()
+    assert set(res) == set(MyTTBench.EVENT_CASES)
+    assert not failed(res)
+
+
+def test_batch_rows_match_single_series():
+    # ok 为 None 表示该函数不支持2维输入, 不算失败
+    res = MyTTBench.check_batch()
+    assert res and not failed(res)
+
+
+def test_plan_matches_direct_calls():
+    res = MyTTBench.check_plan()
+    assert res and not failed(res)
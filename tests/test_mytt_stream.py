@@ -0,0 +1,9 @@
+import MyTTStream
+
+
+def test_stream_matches_batch():
+    assert MyTTStream.verify()
+
+
+def test_stream_matches_batch_other_seed():
+    assert MyTTStream.verify(n=200, seed=7, warmup=40)
@@ -0,0 +1,168 @@
+import gc
+import os
+import re
+import threading
+import time
+
+import pytest
+
+import Charts
+import main
+import server
+from conftest import DEFAULT_FONT_PATH, ROOT, make_bars
+
+STOCKS = {'甲': 'sh600000', '乙': 'sz000001'}
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """在临时目录里生成报告：public/ 写入临时目录，static/ 下链接仓库中的模板、样式、脚本和当前使用的字体"""
+    os.makedirs(tmp_path / 'static')
+    for name in os.listdir(os.path.join(ROOT, 'static')):
+        os.symlink(os.path.join(ROOT, 'static', name), tmp_path / 'static' / name)
+    font = tmp_path / DEFAULT_FONT_PATH
+    if not font.exists():
+        # 图表子进程重新导入 Charts，在工作目录下按默认的 FONT_PATH 找字体
+        font.parent.mkdir(parents=True, exist_ok=True)
+        font.symlink_to(Charts.FONT_PATH)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(server.app, 'root_path', str(tmp_path))
+    monkeypatch.setattr(main.StockAnalyzer, 'fetch_data',
+                        lambda self: self.data.update({code: make_bars(120, i) for i, code in enumerate(self.stock_codes)}))
+    monkeypatch.setenv('CHART_WORKERS', '1')
+    return tmp_path
+
+
+def test_streamed_report_images_resolve(workdir, monkeypatch):
+    monkeypatch.setenv('CHART_MODE', 'file')
+    client = server.app.test_client()
+
+    html = client.post('/analyze_stocks/stream', json=STOCKS).get_data(as_text=True)
+    sources = re.findall(r'<img src="([^"]+)"', html)
+    assert len(sources) == len(STOCKS)
+    for src in sources:
+        # 浏览器按页面地址解析图片地址
+        url = src if src.startswith('/') else '/analyze_stocks/' + src
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.mimetype == 'image/png'
+        assert response.data.startswith(b'\x89PNG')
+
+    # 同时写入的 public/index.html 在 /public/ 下访问时也能找到图片
+    assert (workdir / 'public' / 'index.html').read_text(encoding='utf-8') == html
+    for src in sources:
+        assert client.get(src).status_code == 200
+
+
+def test_run_analysis_uses_relative_chart_urls(workdir):
+    # 命令行生成的静态报告直接用文件打开，图表地址相对报告文件
+    analyzer = main.StockAnalyzer(STOCKS)
+    path = analyzer.run_analysis(str(workdir / 'out' / 'index.html'), chart_mode='file')
+    html = open(path, encoding='utf-8').read()
+    sources = re.findall(r'<img src="([^"]+)"', html)
+    assert len(sources) == len(STOCKS)
+    for src in sources:
+        assert src.startswith('charts/')
+        assert (workdir / 'out' / src).is_file()
+
+
+def test_concurrent_streams_do_not_share_temp_file(workdir):
+    # 两个请求同时写同一份报告：各自的临时文件互不干扰，最后的文件是其中一份完整的报告
+    output = str(workdir / 'public' / 'index.html')
+    barrier = threading.Barrier(2)
+    results = {}
+
+    def stream(stocks):
+        chunks = []
+        for chunk in main.StockAnalyzer(stocks).stream_analysis(output, chart_mode='client'):
+            chunks.append(chunk)
+            if len(chunks) == 1:
+                barrier.wait(timeout=30)
+        results[tuple(stocks)] = ''.join(chunks)
+
+    threads = [threading.Thread(target=stream, args=({name: code},)) for name, code in STOCKS.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 2
+    assert open(output, encoding='utf-8').read() in results.values()
+    assert not [name for name in os.listdir(workdir / 'public') if name.endswith('.tmp')]
+
+
+class SlowAI:
+    """每次请求耗时 delay 秒的假AI，记录开始请求的股票"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.started = []
+
+    def request_analysis(self, df, indicators):
+        self.started.append(len(df))
+        time.sleep(self.delay)
+        return {'AI分析结果': {'分析状态': '成功'}}
+
+
+def slow_analyzer(workdir, n, delay):
+    analyzer = main.StockAnalyzer({f'S{i}': f'sh60000{i}' for i in range(n)})
+    analyzer.fetch_data()
+    analyzer.deepseek = SlowAI(delay)
+    return analyzer
+
+
+def test_pipeline_runs_while_consumer_is_busy(workdir):
+    # 消费方处理第一只股票的片段时，后面股票的AI请求继续依次进行
+    analyzer = slow_analyzer(workdir, 3, 0.1)
+    chunks = analyzer.iter_html_report(llm_workers=1, chart_mode='client')
+    next(chunks)
+    next(chunks)
+    time.sleep(1)
+    assert len(analyzer.deepseek.started) == 3
+    assert len(list(chunks)) == 3
+
+
+def test_closing_report_early_stops_pipeline(workdir):
+    analyzer = slow_analyzer(workdir, 4, 0.2)
+    before = threading.active_count()
+    chunks = analyzer.iter_html_report(llm_workers=1, chart_mode='client')
+    next(chunks)
+    next(chunks)
+    start = time.monotonic()
+    chunks.close()
+    assert time.monotonic() - start < 2
+    assert threading.active_count() == before
+    assert len(analyzer.deepseek.started) < 4
+
+
+def test_chart_process_pool_is_spawned_once(workdir):
+    # 多进程渲染的进程池用 spawn 方式创建，之后的报告复用同一个进程池
+    analyzer = main.StockAnalyzer(STOCKS)
+    analyzer.fetch_data()
+    first = analyzer.generate_html_report(chart_workers=2, chart_mode='png')
+    pool = main._chart_pool(2)
+    second = analyzer.generate_html_report(chart_workers=2, chart_mode='png')
+    assert main._chart_pool(2) is pool
+    assert pool._mp_context.get_start_method() == 'spawn'
+    assert len(re.findall(r'<img src="data:image/png;base64,', first)) == len(STOCKS)
+    timestamp = r'\d{4}年\d\d月\d\d日 \d\d时\d\d分\d\d秒'
+    assert re.sub(timestamp, '', first) == re.sub(timestamp, '', second)
+
+
+def test_failed_analysis_retrieves_chart_result(workdir, monkeypatch, caplog):
+    # 分析出错时报告生成失败，已经渲染完（这里是渲染失败）的图表结果被取走，不留下未读取的异常
+    def broken_chart(*args):
+        raise RuntimeError('图表渲染失败')
+
+    def broken_analysis(self, code, with_ai=True):
+        time.sleep(0.2)
+        raise ValueError('分析失败')
+
+    monkeypatch.setattr(main, 'plot_indicators', broken_chart)
+    monkeypatch.setattr(main.StockAnalyzer, 'generate_analysis_data', broken_analysis)
+    analyzer = main.StockAnalyzer(STOCKS)
+    analyzer.fetch_data()
+    with pytest.raises(ValueError, match='分析失败'):
+        analyzer.generate_html_report(chart_mode='png')
+    gc.collect()
+    assert 'never retrieved' not in caplog.text
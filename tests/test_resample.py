@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import Ashare
+from Ashare import Bars
+from AshareCalendar import get_calendar
+from AshareResample import get_price_multi, resample, to_minutes
+
+
+def daily_bars():
+    days = get_calendar().sessions_in('2024-09-02', '2024-11-29')
+    r = np.random.default_rng(0)
+    close = 10 + np.cumsum(r.normal(0, 0.1, len(days)))
+    high = close + r.random(len(days))
+    low = close - r.random(len(days))
+    return Bars(days.astype('datetime64[ns]').view('i8'), close + 0.05, high, low, close, r.integers(100, 1000, len(days)).astype(np.float64))
+
+
+def expected(df, key):
+    g = df.groupby(key)
+    out = pd.DataFrame({'open': g['open'].first(), 'high': g['high'].max(), 'low': g['low'].min(),
+                        'close': g['close'].last(), 'volume': g['volume'].sum()})
+    out.index = g.apply(lambda x: x.index[-1], include_groups=False).values
+    return out
+
+
+@pytest.mark.parametrize('frequency,key', [('1w', lambda i: i.to_period('W')), ('1M', lambda i: i.to_period('M'))])
+def test_weekly_and_monthly_match_groupby(frequency, key):
+    df = daily_bars().to_df()
+    out = resample(df, frequency)
+    ref = expected(df, key(df.index))
+    np.testing.assert_array_equal(out.index.values, ref.index.values)
+    np.testing.assert_allclose(out.values, ref[out.columns].values)
+
+
+def test_weekly_spans_holiday():
+    out = resample(daily_bars(), '1w')
+    days = out.time.view('datetime64[ns]').astype('datetime64[D]')
+    # 国庆长假那一周只有 09-30 一个交易日，下一周从 10-08 开始
+    assert np.datetime64('2024-09-30') in days
+    assert np.datetime64('2024-10-11') in days
+
+
+def minute_bars(day='2024-10-08'):
+    clock = np.r_[570, np.arange(571, 691), np.arange(781, 901)]        # 09:30集合竞价 + 上午120根 + 下午120根
+    t = (np.datetime64(day) + clock.astype('timedelta64[m]')).astype('datetime64[ns]').view('i8')
+    price = 10 + np.arange(len(clock)) / 100
+    return Bars(t, price, price + 0.01, price - 0.01, price, np.ones(len(clock)))
+
+
+def test_minutes_follow_trading_sessions():
+    bars = minute_bars()
+    out = to_minutes(bars, '60m')
+    labels = out.time.view('datetime64[ns]').astype('datetime64[m]').astype(str)
+    assert [s[-5:] for s in labels] == ['10:30', '11:30', '14:00', '15:00']
+    np.testing.assert_array_equal(out.volume, [61, 60, 60, 60])         # 09:30那根并入第一根
+    assert out.open[0] == bars.open[0] and out.close[-1] == bars.close[-1]
+    assert len(to_minutes(bars, '15m')) == 16
+    assert len(to_minutes(bars, '30m')) == 8
+
+
+def test_get_price_multi_fetches_once(monkeypatch):
+    bars = daily_bars()
+    calls = []
+
+    def fake_get_price(code, end_date='', count=10, frequency='1d', as_bars=False, **kw):
+        calls.append((frequency, count))
+        return bars[-count:]
+
+    monkeypatch.setattr(Ashare, 'get_price', fake_get_price)
+    frames = get_price_multi('sh600519', ['1d', '1w', '1M'], count=2)
+    assert calls == [('1d', 2 * 23 + 23)]
+    assert list(frames) == ['1d', '1w', '1M']
+    assert all(len(df) == 2 for df in frames.values())
+    assert frames['1M'].index[-1] == pd.Timestamp('2024-11-29')
+    with pytest.raises(ValueError):
+        get_price_multi('sh600519', ['1d', '5m'])
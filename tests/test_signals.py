@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+import main
+import Signals
+from conftest import make_bars
+
+
+def indicators(n, seed=0):
+    bars = make_bars(n, seed)
+    matrix = main.compute_indicator_matrix(bars['close'].values, bars['open'].values, bars['high'].values,
+                                           bars['low'].values, bars['volume'].values)
+    return main.indicator_frame(bars, matrix)
+
+
+def test_screen_matches_per_stock_signals():
+    frames = {f'sh60000{i}': indicators(120, i) for i in range(4)}
+    result = Signals.screen(frames)
+    for code, df in frames.items():
+        expected = Signals.evaluate(df)[:, -1]
+        np.testing.assert_array_equal(result.loc[code].values, expected)
+
+
+def test_screen_without_stocks():
+    result = Signals.screen({})
+    assert result.empty
+    assert list(result.columns) == Signals.NAMES
+
+
+def test_screen_short_history():
+    # 只有一根K线的股票没有前值，交叉信号不触发，其余股票不受影响
+    frames = {'sh600000': indicators(120), 'sh600001': indicators(1, 1), 'sh600002': indicators(0, 2)}
+    result = Signals.screen(frames)
+    assert list(result.index) == list(frames)
+    np.testing.assert_array_equal(result.loc['sh600000'].values, Signals.evaluate(frames['sh600000'])[:, -1])
+    one_bar = Signals.evaluate(frames['sh600001'])[:, -1]
+    np.testing.assert_array_equal(result.loc['sh600001'].values, one_bar)
+    assert not result.loc['sh600002'].any()
+    cross = [rule[1] for rule in Signals.RULES if rule[2][0].startswith('cross')]
+    assert not result.loc['sh600001', cross].any()
+
+
+def test_screen_signals_without_data():
+    analyzer = main.StockAnalyzer({'甲': 'sh600000'})
+    result = analyzer.screen_signals()
+    assert isinstance(result, pd.DataFrame)
+    assert result.empty
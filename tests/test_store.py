@@ -0,0 +1,88 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from Ashare import Bars
+from AshareCalendar import get_calendar
+from AshareStore import BarStore
+
+
+class FakeSource:
+    """按交易日历生成日线的假数据源，记录每次请求的 count。"""
+
+    def __init__(self, days=80):
+        today = datetime.datetime.now()
+        self.days = get_calendar().sessions_in(today - datetime.timedelta(days=days * 2), today)[-days:]
+        self.close = 10 + np.arange(len(self.days), dtype=np.float64) / 10
+        self.available = len(self.days)
+        self.calls = []
+
+    def __call__(self, code, end_date='', count=10, frequency='1d', as_bars=True):
+        self.calls.append((end_date, count))
+        days = self.days[:self.available]
+        if end_date:
+            days = days[days <= np.datetime64(end_date, 'D')]
+        days = days[-count:]
+        idx = np.searchsorted(self.days, days)
+        close = self.close[idx]
+        bars = Bars(days.astype('datetime64[ns]').view('i8'), close, close + 0.1, close - 0.1, close, np.full(len(days), 100.0))
+        return bars if as_bars else bars.to_df()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BarStore(str(tmp_path))
+
+
+def test_first_fetch_is_full_and_saved(store):
+    source = FakeSource()
+    bars = store.get_price('sh600000', count=30, fetch=source, as_bars=True)
+    assert source.calls == [('', 30)]
+    np.testing.assert_array_equal(bars.close, source.close[-30:])
+    assert len(store.load('sh600000', '1d')) == 30
+
+
+def test_top_up_fetches_only_new_bars(store):
+    source = FakeSource()
+    source.available -= 3                                   # 仓库里少了最近3个交易日
+    store.get_price('sh600000', count=30, fetch=source)
+    source.available += 3
+    source.calls.clear()
+    df = store.get_price('sh600000', count=30, fetch=source)
+    assert source.calls == [('', 3 + store.overlap)]
+    np.testing.assert_array_equal(df['close'].values, source.close[-30:])
+    assert len(store.load('sh600000', '1d')) == 33
+
+
+def test_adjusted_prices_rewrite_history(store):
+    source = FakeSource()
+    source.available -= 3
+    store.get_price('sh600000', count=30, fetch=source)
+    source.available += 3
+    source.close = source.close * 0.9                       # 除权后前复权价格整体变化
+    source.calls.clear()
+    bars = store.get_price('sh600000', count=30, fetch=source, as_bars=True)
+    assert source.calls == [('', 3 + store.overlap), ('', 30)]
+    np.testing.assert_allclose(store.load('sh600000', '1d')['close'], source.close[-30:])
+    np.testing.assert_allclose(bars.close, source.close[-30:])
+
+
+def test_history_is_sliced_from_store(store):
+    source = FakeSource()
+    store.get_price('sh600000', count=60, fetch=source)
+    source.calls.clear()
+    end = str(source.days[-10])
+    bars = store.get_price('sh600000', end_date=end, count=20, fetch=source, as_bars=True)
+    assert source.calls == []
+    np.testing.assert_array_equal(bars.close, source.close[-29:-9])
+    # 仓库覆盖不到的区间透传给数据源
+    store.get_price('sh600000', end_date=str(source.days[5]), count=20, fetch=source, as_bars=True)
+    assert source.calls == [(str(source.days[5]), 20)]
+
+
+def test_gaps_reports_missing_sessions(store):
+    source = FakeSource()
+    bars = source('sh600000', count=30)
+    store.get_price('sh600000', count=30, fetch=lambda *a, **k: bars[np.arange(30) != 10])
+    np.testing.assert_array_equal(store.gaps('sh600000'), source.days[-30:][10:11])